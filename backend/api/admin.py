@@ -1,45 +1,83 @@
 from django.contrib import admin
 
-from .models import Ingredient, Recipe, Tag, User
+from api.ingredient_index import ingredient_index
+from api.models import Ingredient, Recipe, RecipeIngredient, Tag, User
+from api.pagination import EstimatedCountPaginator
+from api.search import search_recipes
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist без полного COUNT(*) на каждой странице."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(LargeTableAdmin):
     list_display = (
         'username',
         'first_name',
         'last_name',
         'email',
+        'recipes_count',
         'is_active'
     )
     list_editable = (
         'is_active',
     )
-    search_fields = ('email', 'username')
+    # Поиск по началу строки без учёта регистра, а не по вхождению:
+    # автодополнению автора в RecipeAdmin хватает первых букв.
+    search_fields = ('email__istartswith', 'username__istartswith')
     list_display_links = ('username',)
+    ordering = ('username',)
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(LargeTableAdmin):
     list_display = (
         'name',
         'measurement_unit',
     )
     search_fields = ('name',)
     list_display_links = ('name',)
+    # Ключ unique_ingredient_unit начинается с name: сортировка по индексу.
+    ordering = ('name', 'measurement_unit')
+
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск и автодополнение идут по индексу названий в памяти.
+        if not search_term:
+            return queryset, False
+        ids = [row['id'] for row in ingredient_index.search(search_term)]
+        return queryset.filter(pk__in=ids), False
+
+
+class RecipeIngredientInline(admin.TabularInline):
+    model = RecipeIngredient
+    autocomplete_fields = ('ingredient',)
+    extra = 1
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(LargeTableAdmin):
     list_display = (
         'name',
         'tags',
         'author',
-        'favourites'
+        'favorites_count',
     )
-    search_fields = ('author', 'title')
+    list_select_related = ('tags', 'author')
+    search_fields = ('name',)
     list_filter = ('tags',)
-    list_display_links = ('tags',)
+    list_display_links = ('name',)
+    autocomplete_fields = ('author', 'tags')
+    inlines = (RecipeIngredientInline,)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Тот же поисковый индекс, что у ?search= в API.
+        if not search_term:
+            return queryset, False
+        return search_recipes(queryset, search_term), False
 
 
 @admin.register(Tag)
@@ -0,0 +1,257 @@
+"""Асинхронные обработчики горячих эндпоинтов чтения для запуска под ASGI.
+
+GET списка и карточки рецепта, тегов и ингредиентов выполняется корутинами
+на async ORM, так что воркер обслуживает много запросов одновременно.
+Запись и редкие режимы чтения (курсорная пагинация, browsable API,
+сессионная аутентификация) передаются синхронным вьюсетам DRF.
+"""
+import copy
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.translation import gettext as _
+from rest_framework import exceptions
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from api.authentication import token_cache
+from api.cache import (
+    aget_generation,
+    conditional_response,
+    make_entry,
+    reference_cache_key
+)
+from api.db_routers import reading_from_replica
+from api.fast_serializers import RecipeListSerializer
+from api.filters import RecipeFilterBackend
+from api.ingredient_index import ingredient_index
+from api.models import Ingredient, Recipe, Tag
+from api.pagination import (
+    COUNT_CACHE_TIMEOUT,
+    PageLimitPagination,
+    RecipePagination,
+    count_cache_key
+)
+from api.serializers import IngredientSerializer, TagSerializer
+from api.views import IngredientViewSet, RecipeViewSet, TagViewSet
+
+DETAIL_ACTIONS = {
+    'get': 'retrieve',
+    'put': 'update',
+    'patch': 'partial_update',
+    'delete': 'destroy',
+}
+
+
+class Fallback(Exception):
+    """Запрос должен обслужить синхронный вьюсет."""
+
+
+def json_response(data, status=200):
+    return HttpResponse(
+        JSONRenderer().render(data),
+        content_type='application/json',
+        status=status
+    )
+
+
+def error_response(exc):
+    # Та же форма ответа, что у exception_handler DRF.
+    detail = exc.detail
+    if not isinstance(detail, (list, dict)):
+        detail = {'detail': detail}
+    response = json_response(detail, exc.status_code)
+    if isinstance(exc, exceptions.AuthenticationFailed):
+        response['WWW-Authenticate'] = 'Token'
+    return response
+
+
+async def authenticate(request):
+    """Пользователь по заголовку Authorization: Token <key>.
+
+    Повторяет CachedTokenAuthentication: токен сначала ищется в общем
+    кэше, промах загружается через async ORM.
+    """
+    header = request.headers.get('Authorization', '').split()
+    if not header:
+        if settings.SESSION_COOKIE_NAME in request.COOKIES:
+            raise Fallback
+        return AnonymousUser()
+    if len(header) != 2 or header[0].lower() != 'token':
+        raise Fallback
+    key = header[1]
+    cached = await token_cache.aget(key)
+    if cached is None:
+        try:
+            token = await Token.objects.select_related('user').aget(key=key)
+        except Token.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        cached = (token.user, token)
+        await token_cache.aset(key, cached)
+    return copy.copy(cached[0])
+
+
+def read_view(sync_view):
+    """GET отдаёт корутине-обработчику, остальное — sync_view.
+
+    Обработчик получает пользователя и читает из реплики, если она
+    настроена; Fallback внутри него тоже передаёт запрос sync_view.
+    """
+    view_class, actions = sync_view.cls, sync_view.actions
+    sync_view = sync_to_async(sync_view)
+
+    def decorator(handler):
+        async def view(request, *args, **kwargs):
+            if (
+                request.method == 'GET'
+                and 'format' not in request.GET
+                and 'text/html' not in request.headers.get('Accept', '')
+            ):
+                try:
+                    user = await authenticate(request)
+                    replica = reading_from_replica.set(True)
+                    try:
+                        return await handler(request, user, *args, **kwargs)
+                    finally:
+                        reading_from_replica.reset(replica)
+                except Fallback:
+                    pass
+                except exceptions.APIException as exc:
+                    return error_response(exc)
+            return await sync_view(request, *args, **kwargs)
+
+        # Как и у вьюсетов DRF: CSRF проверяет SessionAuthentication.
+        view.csrf_exempt = True
+        # Метрики подписывают запрос действием вьюсета, как у sync_view.
+        view.cls, view.actions = view_class, actions
+        return view
+    return decorator
+
+
+async def cached_count(queryset):
+    # Ключ общий с CachedCountPaginator синхронного списка.
+    key = await sync_to_async(count_cache_key)(queryset)
+    count = await cache.aget(key)
+    if count is None:
+        count = await queryset.acount()
+        await cache.aset(key, count, COUNT_CACHE_TIMEOUT)
+    return count
+
+
+async def cached_reference(request, model, load):
+    """Асинхронный аналог CachedReferenceMixin.cached_response."""
+    generation = await aget_generation(model)
+    key = reference_cache_key(model, generation, request)
+    entry = await cache.aget(key)
+    if entry is None:
+        data = await load()
+        if data is None:
+            raise exceptions.NotFound()
+        entry = make_entry(data)
+        await cache.aset(key, entry, settings.REFERENCE_CACHE_TIMEOUT)
+    return conditional_response(request, entry, generation)
+
+
+@read_view(RecipeViewSet.as_view({'get': 'list', 'post': 'create'}))
+async def recipe_list(request, user):
+    drf_request = Request(request)
+    if RecipePagination().is_cursor_mode(drf_request):
+        raise Fallback
+    queryset = RecipeFilterBackend().filter_queryset(
+        drf_request,
+        Recipe.objects.with_related().with_user_flags(user),
+        None
+    )
+    limit = PageLimitPagination().get_page_size(drf_request)
+    page = request.GET.get('page', '1')
+    if page in PageLimitPagination.last_page_strings:
+        raise Fallback
+    page = int(page) if page.isdigit() else 0
+    if page < 1:
+        raise exceptions.NotFound(_('Invalid page.'))
+    # Как CachedCountPaginator.page: лишняя строка показывает, есть ли
+    # следующая страница, кэшированный count выборку не ограничивает.
+    bottom = (page - 1) * limit
+    recipes = [
+        recipe async for recipe in queryset[bottom:bottom + limit + 1]
+    ]
+    has_next = len(recipes) > limit
+    recipes = recipes[:limit]
+    if not recipes and page > 1:
+        raise exceptions.NotFound(_('Invalid page.'))
+    read = bottom + len(recipes)
+    count = (
+        max(await cached_count(queryset), read + 1) if has_next else read
+    )
+    url = request.build_absolute_uri()
+    return json_response({
+        'count': count,
+        'next': (
+            replace_query_param(url, 'page', page + 1) if has_next else None
+        ),
+        'previous': (
+            None if page == 1
+            else remove_query_param(url, 'page') if page == 2
+            else replace_query_param(url, 'page', page - 1)
+        ),
+        'results': RecipeListSerializer(
+            recipes, context={'request': request}
+        ).data,
+    })
+
+
+@read_view(RecipeViewSet.as_view(DETAIL_ACTIONS))
+async def recipe_detail(request, user, pk):
+    recipe = await Recipe.objects.with_related().with_user_flags(
+        user
+    ).filter(pk=pk).afirst()
+    if recipe is None:
+        raise exceptions.NotFound()
+    return json_response(
+        RecipeListSerializer([recipe], context={'request': request}).data[0]
+    )
+
+
+@read_view(TagViewSet.as_view({'get': 'list'}))
+async def tag_list(request, user):
+    async def load():
+        return [TagSerializer(tag).data async for tag in Tag.objects.all()]
+    return await cached_reference(request, Tag, load)
+
+
+@read_view(TagViewSet.as_view({'get': 'retrieve'}))
+async def tag_detail(request, user, pk):
+    async def load():
+        tag = await Tag.objects.filter(pk=pk).afirst()
+        return None if tag is None else TagSerializer(tag).data
+    return await cached_reference(request, Tag, load)
+
+
+@read_view(IngredientViewSet.as_view({'get': 'list', 'post': 'create'}))
+async def ingredient_list(request, user):
+    async def load():
+        # Индекс строится из базы только при первом обращении.
+        return await sync_to_async(ingredient_index.search)(
+            request.GET.get('name', '')
+        )
+    return await cached_reference(request, Ingredient, load)
+
+
+@read_view(IngredientViewSet.as_view(DETAIL_ACTIONS))
+async def ingredient_detail(request, user, pk):
+    async def load():
+        ingredient = await Ingredient.objects.filter(pk=pk).afirst()
+        return (
+            None if ingredient is None
+            else IngredientSerializer(ingredient).data
+        )
+    return await cached_reference(request, Ingredient, load)
@@ -0,0 +1,63 @@
+import copy
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class TokenCache:
+    """Кэш token -> (user, token) в общем кэше Django со сроком жизни.
+
+    Записи видны всем воркерам (проверка api.E001): выход, удаление
+    токена и сохранение пользователя сбрасывают их сигналами сразу
+    во всех процессах.
+    """
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+
+    @staticmethod
+    def cache_key(key):
+        return f'auth-token:{key}'
+
+    def get(self, key):
+        return cache.get(self.cache_key(key))
+
+    async def aget(self, key):
+        return await cache.aget(self.cache_key(key))
+
+    def set(self, key, value):
+        cache.set(self.cache_key(key), value, self.timeout)
+
+    async def aset(self, key, value):
+        await cache.aset(self.cache_key(key), value, self.timeout)
+
+    def delete(self, key):
+        cache.delete(self.cache_key(key))
+
+    def delete_user(self, user_id):
+        cache.delete_many([
+            self.cache_key(key) for key in
+            Token.objects.filter(user_id=user_id).values_list(
+                'key', flat=True
+            )
+        ])
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_TIMEOUT)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication без запроса к authtoken_token на каждый вызов."""
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, (user, token))
+        else:
+            user, token = cached
+        # Копия, чтобы изменения request.user в одном запросе
+        # не попадали в соседние потоки.
+        return copy.copy(user), token
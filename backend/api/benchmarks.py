@@ -0,0 +1,134 @@
+import random
+from math import ceil
+from statistics import median
+from time import perf_counter
+
+from api.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCartItem,
+    Subscribe,
+    Tag,
+    User
+)
+from api.search import build_search_index
+from api.utils import batches
+
+BATCH_SIZE = 5_000
+RECIPE_WORDS = (
+    'курица', 'картофель', 'запечённый', 'суп', 'борщ', 'салат', 'томатный',
+    'сырный', 'пирог', 'яблочный', 'говядина', 'тушёная', 'рис', 'грибы',
+    'сливочный', 'соус', 'острый', 'овощной', 'рагу', 'лимонный',
+)
+
+
+def seed_recipes(recipes, users, tags, ingredients_per_recipe=0,
+                 prefix='bench', favorites_per_recipe=1,
+                 subscriptions_per_user=0):
+    """Создаёт синтетических пользователей, теги, рецепты и подписки.
+
+    Каждый рецепт попадает в избранное и в корзину favorites_per_recipe
+    случайных пользователей. Рецепты, их связи и поисковый индекс пишутся
+    пачками по BATCH_SIZE, в памяти держатся только id пользователей,
+    поэтому генерация миллиона строк не упирается в память.
+    Возвращает список id созданных пользователей.
+    """
+    user_ids = []
+    for batch in batches(range(users), BATCH_SIZE):
+        user_ids += [
+            user.pk for user in User.objects.bulk_create(
+                User(
+                    username=f'{prefix}-{i}',
+                    email=f'{prefix}-{i}@example.com'
+                )
+                for i in batch
+            )
+        ]
+    tags = Tag.objects.bulk_create(
+        Tag(tag=f'Тег {prefix} {i}', slug=f'{prefix}-tag-{i}')
+        for i in range(tags)
+    )
+    ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+    favorites_per_recipe = min(favorites_per_recipe, len(user_ids))
+    for batch in batches(range(recipes), BATCH_SIZE):
+        created = Recipe.objects.bulk_create(
+            Recipe(
+                name=f'{prefix}-{i} ' + ' '.join(
+                    random.sample(RECIPE_WORDS, 2)
+                ),
+                author_id=random.choice(user_ids),
+                tags=random.choice(tags),
+                image='img/bench.png',
+                text=' '.join(random.sample(RECIPE_WORDS, 6)),
+                cooking_time=random.randint(1, 240),
+            )
+            for i in batch
+        )
+        for model in (Favorite, ShoppingCartItem):
+            model.objects.bulk_create(
+                model(user_id=user_id, recipe=recipe)
+                for recipe in created
+                for user_id in random.sample(user_ids, favorites_per_recipe)
+            )
+        if ingredients_per_recipe and ingredient_ids:
+            RecipeIngredient.objects.bulk_create(
+                (
+                    RecipeIngredient(
+                        recipe=recipe,
+                        ingredient_id=ingredient_id,
+                        amount=random.randint(1, 500)
+                    )
+                    for recipe in created
+                    for ingredient_id in random.sample(
+                        ingredient_ids,
+                        min(ingredients_per_recipe, len(ingredient_ids))
+                    )
+                ),
+                batch_size=BATCH_SIZE
+            )
+        build_search_index(
+            Recipe.objects.filter(pk__in=[recipe.pk for recipe in created])
+        )
+    if subscriptions_per_user:
+        seed_subscriptions(user_ids, subscriptions_per_user)
+    return user_ids
+
+
+def seed_subscriptions(user_ids, per_user):
+    """Подписывает каждого пользователя на per_user случайных авторов."""
+    per_user = min(per_user, len(user_ids) - 1)
+    for batch in batches(user_ids, BATCH_SIZE):
+        Subscribe.objects.bulk_create(
+            Subscribe(user_id=user_id, subscription_id=author_id)
+            for user_id in batch
+            for author_id in [
+                author_id
+                for author_id in random.sample(user_ids, per_user + 1)
+                if author_id != user_id
+            ][:per_user]
+        )
+
+
+def p95(timings):
+    """95-й процентиль по методу ближайшего ранга: значение, не меньше
+    которого 95% замеров."""
+    ordered = sorted(timings)
+    return ordered[ceil(len(ordered) * 0.95) - 1]
+
+
+def measure(function, repeat, setup=None):
+    """Медиана и p95 времени вызова function в миллисекундах.
+
+    setup, если задан, вызывается перед каждым повтором вне замера,
+    например чтобы очистить кэш.
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = perf_counter()
+        function()
+        timings.append((perf_counter() - started) * 1000)
+    return median(timings), p95(timings)
@@ -0,0 +1,102 @@
+from hashlib import md5
+from time import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+REFERENCE_CACHE_PREFIX = 'reference'
+
+
+def generation_key(model):
+    return f'{REFERENCE_CACHE_PREFIX}:{model._meta.model_name}:generation'
+
+
+def get_generation(model):
+    """Время последнего изменения справочника; входит в ключи кэша."""
+    key = generation_key(model)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time(), None)
+        generation = cache.get(key, time())
+    return generation
+
+
+async def aget_generation(model):
+    key = generation_key(model)
+    generation = await cache.aget(key)
+    if generation is None:
+        await cache.aadd(key, time(), None)
+        generation = await cache.aget(key, time())
+    return generation
+
+
+def reference_cache_key(model, generation, request):
+    return '{}:{}:{}'.format(
+        REFERENCE_CACHE_PREFIX,
+        model._meta.model_name,
+        md5(f'{generation}:{request.get_full_path()}'.encode()).hexdigest()
+    )
+
+
+def make_entry(data):
+    body = JSONRenderer().render(data)
+    return body, f'"{md5(body).hexdigest()}"'
+
+
+def conditional_response(request, entry, generation):
+    """Ответ из записи кэша с ETag/Last-Modified или 304."""
+    body, etag = entry
+    last_modified = int(generation)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def invalidate_reference_cache(model):
+    # Старые записи не удаляем: с новым поколением их ключи больше
+    # не запрашиваются и истекут через REFERENCE_CACHE_TIMEOUT.
+    cache.set(generation_key(model), time(), None)
+
+
+class CachedReferenceMixin:
+    """Кэширует готовые JSON-байты list/retrieve для справочников.
+
+    При попадании в кэш не выполняются ни запросы к базе, ни сериализатор.
+    Ответ несёт ETag и Last-Modified, так что повторный запрос клиента
+    с If-None-Match/If-Modified-Since получает 304.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, super().retrieve, *args, **kwargs
+        )
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            return handler(request, *args, **kwargs)
+        model = self.get_queryset().model
+        generation = get_generation(model)
+        key = reference_cache_key(model, generation, request)
+        entry = cache.get(key)
+        if entry is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            entry = make_entry(response.data)
+            cache.set(key, entry, settings.REFERENCE_CACHE_TIMEOUT)
+        return conditional_response(request, entry, generation)
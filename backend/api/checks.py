@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Несколько воркеров должны делить один кэш.
+
+    Через кэш процессы узнают о смене поколения справочников, индекса
+    ингредиентов и лент подписок и об отозванных токенах; в LocMemCache
+    каждый воркер видит только свои изменения и отдаёт устаревшие данные.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.WEB_CONCURRENCY > 1 and backend in PROCESS_LOCAL_CACHES:
+        return [Error(
+            f'{backend} не разделяется между {settings.WEB_CONCURRENCY} '
+            'воркерами.',
+            hint='Задайте CACHE_BACKEND и CACHE_LOCATION общего кэша, '
+                 'например django.core.cache.backends.redis.RedisCache.',
+            id='api.E001',
+        )]
+    return []
@@ -0,0 +1,45 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from api.models import Favorite, Recipe, ShoppingCartItem, User
+
+# Связь -> (модель со счётчиком, поле внешнего ключа, поле счётчика).
+COUNTERS = {
+    Favorite: (Recipe, 'recipe_id', 'favorites_count'),
+    ShoppingCartItem: (Recipe, 'recipe_id', 'shopping_cart_count'),
+    Recipe: (User, 'author_id', 'recipes_count'),
+}
+
+
+def change_counter(instance, delta):
+    """Атомарно сдвигает счётчик, который ведёт instance.
+
+    Один UPDATE ... SET x = x + delta: параллельные запросы не теряют
+    изменений и не ждут блокировки строки дольше самой записи.
+    """
+    model, foreign_key, field = COUNTERS[type(instance)]
+    model.objects.filter(pk=getattr(instance, foreign_key)).update(
+        **{field: F(field) + delta}
+    )
+
+
+def count_of(model, foreign_key):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{foreign_key: OuterRef('pk')})
+            .order_by()
+            .values(foreign_key)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0
+    )
+
+
+def recount():
+    """Пересчитывает все счётчики двумя UPDATE с подзапросами."""
+    Recipe.objects.update(
+        favorites_count=count_of(Favorite, 'recipe'),
+        shopping_cart_count=count_of(ShoppingCartItem, 'recipe'),
+    )
+    User.objects.update(recipes_count=count_of(Recipe, 'author'))
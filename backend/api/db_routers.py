@@ -0,0 +1,47 @@
+from contextvars import ContextVar
+
+REPLICA_DATABASE = 'replica'
+REPLICA_ACTIONS = ('list', 'retrieve')
+
+reading_from_replica = ContextVar('reading_from_replica', default=False)
+
+
+class ReadReplicaRouter:
+    """Отправляет чтение в реплику, пока обрабатывается list/retrieve.
+
+    Запись, миграции и остальные действия всегда идут в default.
+    После записи чтение до конца обработки тоже идёт в default: реплика
+    может ещё не получить изменения.
+    """
+
+    def db_for_read(self, model, **hints):
+        if reading_from_replica.get():
+            return REPLICA_DATABASE
+        return None
+
+    def db_for_write(self, model, **hints):
+        reading_from_replica.set(False)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaReadMixin:
+    """Включает чтение из реплики на время list/retrieve вьюсета."""
+
+    def initial(self, request, *args, **kwargs):
+        # Аутентификация и права проверяются по основной базе.
+        super().initial(request, *args, **kwargs)
+        if self.action in REPLICA_ACTIONS:
+            self._replica_token = reading_from_replica.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            reading_from_replica.reset(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
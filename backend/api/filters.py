@@ -0,0 +1,36 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from api.search import search_recipes
+
+
+class RecipeFilterBackend(BaseFilterBackend):
+    """Фильтры списка рецептов из спецификации API.
+
+    Теги объединяются через ИЛИ, остальные параметры — через И. Все условия
+    уходят в WHERE одного запроса: избранное и корзина фильтруются по
+    EXISTS-аннотациям из RecipeQuerySet.with_user_flags(). ?search= ищет
+    по поисковому индексу и сортирует по релевантности.
+    """
+
+    flag_params = ('is_favorited', 'is_in_shopping_cart')
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        tags = params.getlist('tags')
+        if tags:
+            queryset = queryset.filter(tags__slug__in=tags)
+        author = params.get('author')
+        if author:
+            if not author.isdigit():
+                raise ValidationError(
+                    {'author': 'Ожидается id пользователя.'}
+                )
+            queryset = queryset.filter(author_id=author)
+        for flag in self.flag_params:
+            if params.get(flag) == '1':
+                queryset = queryset.filter(**{flag: True})
+        search = params.get('search', '').strip()
+        if search:
+            queryset = search_recipes(queryset, search)
+        return queryset
@@ -0,0 +1,192 @@
+import base64
+import binascii
+import logging
+import os
+import posixpath
+import re
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+DATA_URL_HEADER = re.compile(
+    r'data:image/(?P<format>png|jpeg|jpg|gif|webp);base64,'
+)
+# Заголовок data URL короткий: ищем его только в начале строки.
+DATA_URL_HEADER_LIMIT = 64
+# Кратно 4, чтобы каждый кусок декодировался независимо.
+DECODE_CHUNK_SIZE = 64 * 1024
+SIGNATURES = {
+    'png': (b'\x89PNG\r\n\x1a\n',),
+    'jpeg': (b'\xff\xd8\xff',),
+    'gif': (b'GIF87a', b'GIF89a'),
+    'webp': (b'RIFF',),
+}
+RENDITION_EXTENSIONS = {
+    'WEBP': 'webp',
+    'JPEG': 'jpg',
+}
+RENDITION_QUALITY = 80
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_WORKERS,
+    thread_name_prefix='images'
+)
+
+
+def decode_base64_image(data):
+    """Декодирует data URL по частям во временный файл.
+
+    Формат и размер проверяются до декодирования всего содержимого:
+    размер считается по длине base64, формат — по сигнатуре первого куска.
+    """
+    match = DATA_URL_HEADER.match(data, 0, DATA_URL_HEADER_LIMIT)
+    if match is None:
+        raise serializers.ValidationError(
+            'Поддерживаются изображения PNG, JPEG, GIF и WEBP.'
+        )
+    image_format = match['format'].replace('jpg', 'jpeg')
+    start = match.end()
+    encoded_size = len(data) - start
+    size = encoded_size // 4 * 3 - data.count('=', len(data) - 2)
+    if encoded_size % 4 or size <= 0:
+        raise serializers.ValidationError('Некорректные данные base64.')
+    if size > settings.MAX_IMAGE_UPLOAD_SIZE:
+        raise serializers.ValidationError(
+            'Размер изображения больше '
+            f'{settings.MAX_IMAGE_UPLOAD_SIZE // (1024 * 1024)} МБ.'
+        )
+    file = TemporaryUploadedFile(
+        f'image.{image_format}', f'image/{image_format}', size, None
+    )
+    try:
+        for offset in range(start, len(data), DECODE_CHUNK_SIZE):
+            chunk = base64.b64decode(
+                data[offset:offset + DECODE_CHUNK_SIZE], validate=True
+            )
+            if offset == start and not chunk.startswith(
+                SIGNATURES[image_format]
+            ):
+                raise serializers.ValidationError(
+                    'Содержимое не совпадает с заявленным форматом.'
+                )
+            file.write(chunk)
+    except binascii.Error:
+        file.close()
+        raise serializers.ValidationError('Некорректные данные base64.')
+    except serializers.ValidationError:
+        file.close()
+        raise
+    file.seek(0)
+    return file
+
+
+def rendition_name(name, rendition):
+    """Имя файла варианта рядом с оригиналом: img/cake.png ->
+    img/cake.thumbnail.webp. Подходит и для имён в хранилище, и для путей."""
+    stem, _ = posixpath.splitext(name)
+    extension = RENDITION_EXTENSIONS[settings.IMAGE_RENDITION_FORMAT]
+    return f'{stem}.{rendition}.{extension}'
+
+
+def rendition_urls(file):
+    """Ссылки на варианты изображения. Пока фоновая обработка не создала
+    вариант, вместо него отдаётся ссылка на оригинал."""
+    if not file:
+        return None
+    urls = {}
+    for rendition in settings.IMAGE_RENDITIONS:
+        name = rendition_name(file.name, rendition)
+        urls[rendition] = (
+            file.storage.url(name) if file.storage.exists(name) else file.url
+        )
+    return urls
+
+
+def delete_renditions(storage, name):
+    """Удаляет варианты изображения name; отсутствующие пропускаются."""
+    for rendition in settings.IMAGE_RENDITIONS:
+        storage.delete(rendition_name(name, rendition))
+
+
+def open_image(path):
+    with Image.open(path) as source:
+        is_animated = getattr(source, 'is_animated', False)
+        image_format = source.format
+        source.load()
+        image = ImageOps.exif_transpose(source)
+    return image, image_format, is_animated
+
+
+def save_atomically(image, path, **params):
+    """Сохраняет image во временный файл рядом с path и подменяет path
+    через os.replace: читатель получает старый файл или новый целиком,
+    но не наполовину записанный."""
+    temporary = f'{path}.{uuid4().hex[:8]}.tmp'
+    try:
+        with open(temporary, 'xb') as file:
+            image.save(file, **params)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+        raise
+
+
+def save_renditions(image, path):
+    image_format = settings.IMAGE_RENDITION_FORMAT
+    for rendition, size in settings.IMAGE_RENDITIONS.items():
+        variant = image.copy()
+        variant.thumbnail(size)
+        if variant.mode not in ('RGB', 'RGBA') or (
+            image_format == 'JPEG' and variant.mode != 'RGB'
+        ):
+            variant = variant.convert(
+                'RGB' if image_format == 'JPEG' else 'RGBA'
+            )
+        save_atomically(
+            variant,
+            rendition_name(path, rendition),
+            format=image_format,
+            quality=RENDITION_QUALITY
+        )
+
+
+def generate_renditions(path):
+    """Создаёт варианты для уже сохранённого файла; используется
+    в backfill_renditions, поэтому должна выполняться в другом процессе."""
+    image, _, _ = open_image(path)
+    save_renditions(image, path)
+    return path
+
+
+def process_image(path):
+    """Пережимает сохранённое изображение и создаёт его варианты.
+
+    Поворот по EXIF, уменьшение до IMAGE_MAX_DIMENSION, оптимизация;
+    анимированные изображения не пережимаются. Выполняется в фоновом потоке.
+    """
+    try:
+        image, image_format, is_animated = open_image(path)
+        if not is_animated:
+            image.thumbnail(
+                (settings.IMAGE_MAX_DIMENSION, settings.IMAGE_MAX_DIMENSION)
+            )
+            if image_format == 'JPEG' and image.mode != 'RGB':
+                image = image.convert('RGB')
+            save_atomically(
+                image, path, format=image_format, optimize=True
+            )
+        save_renditions(image, path)
+    except Exception:
+        logger.exception('Не удалось обработать изображение %s', path)
+
+
+def schedule_image_processing(file):
+    if file and file.storage.exists(file.name):
+        executor.submit(process_image, file.path)
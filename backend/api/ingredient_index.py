@@ -0,0 +1,91 @@
+from bisect import bisect_left
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+
+from api.cache import get_generation
+from api.models import Ingredient
+
+# Символ, который заведомо больше любой буквы названия: верхняя граница
+# диапазона ключей с заданным префиксом.
+PREFIX_UPPER_BOUND = '\U0010ffff'
+
+
+class IngredientIndex:
+    """Отсортированный in-process индекс названий ингредиентов.
+
+    Поиск по префиксу — два бинарных поиска по списку ключей, то есть
+    O(log n + k) без запроса в базу. Индекс строится лениво при первом
+    обращении и перестраивается после изменения строк Ingredient.
+
+    Сигналы доходят только до своего процесса, а load_ingredients пишет
+    через bulk_create без сигналов. Поэтому не чаще раза
+    в INGREDIENT_INDEX_CHECK_INTERVAL секунд индекс сверяет поколение
+    справочника в общем кэше (api/cache.py) с тем, на котором был построен.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._keys = []
+        self._rows = []
+        self._is_stale = True
+        self._generation = None
+        self._checked_at = 0.0
+
+    def invalidate(self):
+        self._is_stale = True
+
+    def _build(self):
+        # Поколение читаем до строк: изменение во время построения
+        # сменит его, и следующая сверка перестроит индекс.
+        generation = get_generation(Ingredient)
+        rows = sorted(
+            Ingredient.objects.values('id', 'name', 'measurement_unit'),
+            key=lambda row: (row['name'].casefold(), row['id'])
+        )
+        self._keys = [row['name'].casefold() for row in rows]
+        self._rows = rows
+        self._generation = generation
+        self._checked_at = monotonic()
+        self._is_stale = False
+
+    def _check_generation(self):
+        now = monotonic()
+        if now - self._checked_at < settings.INGREDIENT_INDEX_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        if get_generation(Ingredient) != self._generation:
+            self._is_stale = True
+
+    def _snapshot(self):
+        if not self._is_stale:
+            self._check_generation()
+        if self._is_stale:
+            with self._lock:
+                if self._is_stale:
+                    self._build()
+        return self._keys, self._rows
+
+    def search(self, name=''):
+        """Сначала названия, начинающиеся с name, затем содержащие name.
+
+        Пустой запрос возвращает весь справочник в алфавитном порядке.
+        """
+        keys, rows = self._snapshot()
+        query = name.strip().casefold()
+        if not query:
+            return list(rows)
+        start = bisect_left(keys, query)
+        stop = bisect_left(keys, query + PREFIX_UPPER_BOUND, lo=start)
+        prefix_matches = rows[start:stop]
+        # Совпадения внутри названия дешевле найти линейным проходом,
+        # чем держать отдельный суффиксный индекс для ~2 тыс. строк.
+        substring_matches = [
+            row for position, (key, row) in enumerate(zip(keys, rows))
+            if not start <= position < stop and query in key
+        ]
+        return prefix_matches + substring_matches
+
+
+ingredient_index = IngredientIndex()
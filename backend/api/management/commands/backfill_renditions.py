@@ -0,0 +1,69 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from api.images import generate_renditions, rendition_name
+from api.models import Recipe, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт недостающие варианты изображений рецептов и аватаров '
+        'в пуле процессов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать варианты, даже если они уже есть.'
+        )
+
+    def get_paths(self, force):
+        images = (
+            Recipe.objects.exclude(image='')
+            .values_list('image', flat=True).iterator()
+        )
+        avatars = (
+            User.objects.exclude(avatar='').exclude(avatar__isnull=True)
+            .values_list('avatar', flat=True).iterator()
+        )
+        for queryset in (images, avatars):
+            for name in queryset:
+                if not default_storage.exists(name):
+                    continue
+                if not force and all(
+                    default_storage.exists(rendition_name(name, rendition))
+                    for rendition in settings.IMAGE_RENDITIONS
+                ):
+                    continue
+                yield default_storage.path(name)
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        done = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            futures = {
+                pool.submit(generate_renditions, path): path
+                for path in self.get_paths(options['force'])
+            }
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                    done += 1
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write(f'{futures[future]}: {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений: {done}, ошибок: {failed}, '
+            f'за {perf_counter() - started:.1f} с'
+        ))
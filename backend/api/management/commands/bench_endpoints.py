@@ -0,0 +1,353 @@
+import base64
+import json
+import subprocess
+import tempfile
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from io import BytesIO
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test.utils import override_settings
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.benchmarks import RECIPE_WORDS, measure, seed_recipes
+from api.counters import recount
+from api.ingredient_index import ingredient_index
+from api.models import (
+    Ingredient,
+    Recipe,
+    ShoppingCartItem,
+    Subscribe,
+    Tag,
+    User
+)
+
+PASSWORD = 'bench-Pa55word'
+CART_SIZE = 20
+# (название, метод, путь, тело запроса). Пишущие сценарии выполняются
+# в точке сохранения и откатываются, так что каждый повтор видит
+# одни и те же данные.
+SCENARIOS = (
+    ('recipes: список', 'get', '/api/recipes/', None),
+    ('recipes: список, limit=50', 'get', '/api/recipes/?limit=50', None),
+    ('recipes: тег', 'get', '/api/recipes/?tags={tag}', None),
+    ('recipes: автор', 'get', '/api/recipes/?author={author}', None),
+    ('recipes: избранное', 'get', '/api/recipes/?is_favorited=1', None),
+    ('recipes: корзина', 'get', '/api/recipes/?is_in_shopping_cart=1', None),
+    ('recipes: поиск', 'get', '/api/recipes/?search={search}', None),
+    ('recipes: курсор', 'get', '/api/recipes/?cursor=', None),
+    ('recipes: карточка', 'get', '/api/recipes/{recipe}/', None),
+    ('recipes: создание', 'post', '/api/recipes/', 'recipe'),
+    ('recipes: изменение', 'patch', '/api/recipes/{recipe}/', 'recipe'),
+    ('recipes: удаление', 'delete', '/api/recipes/{recipe}/', None),
+    ('recipes: короткая ссылка', 'get', '/api/recipes/{recipe}/get-link/',
+     None),
+    ('recipes: в корзину', 'post', '/api/recipes/{new_recipe}/shopping_cart/',
+     None),
+    ('recipes: лента', 'get', '/api/recipes/feed/', None),
+    ('recipes: список покупок txt', 'get',
+     '/api/recipes/download_shopping_cart/?format=txt', None),
+    ('recipes: список покупок csv', 'get',
+     '/api/recipes/download_shopping_cart/?format=csv', None),
+    ('recipes: список покупок pdf', 'get',
+     '/api/recipes/download_shopping_cart/?format=pdf', None),
+    ('ingredients: список', 'get', '/api/ingredients/', None),
+    ('ingredients: поиск', 'get', '/api/ingredients/?name={ingredient_name}',
+     None),
+    ('ingredients: карточка', 'get', '/api/ingredients/{ingredient}/', None),
+    ('tags: список', 'get', '/api/tags/', None),
+    ('tags: карточка', 'get', '/api/tags/{tag_id}/', None),
+    ('users: список', 'get', '/api/users/', None),
+    ('users: регистрация', 'post', '/api/users/', 'user'),
+    ('users: профиль', 'get', '/api/users/{author}/', None),
+    ('users: me', 'get', '/api/users/me/', None),
+    ('users: подписки', 'get', '/api/users/subscriptions/', None),
+    ('users: подписки, recipes_limit=3', 'get',
+     '/api/users/subscriptions/?recipes_limit=3', None),
+    ('users: подписаться', 'post', '/api/users/{new_author}/subscribe/',
+     None),
+    ('users: отписаться', 'delete', '/api/users/{author}/subscribe/', None),
+    ('users: аватар', 'put', '/api/users/me/avatar/', 'avatar'),
+    ('users: удаление аватара', 'delete', '/api/users/me/avatar/', None),
+    ('users: смена пароля', 'post', '/api/users/set_password/', 'password'),
+    ('auth: вход', 'post', '/api/auth/token/login/', 'login'),
+    ('auth: выход', 'post', '/api/auth/token/logout/', None),
+)
+
+
+class QueryCounter:
+    """Обёртка execute_wrapper, считающая запросы ко всем базам.
+
+    CaptureQueriesContext не подходит: request_started очищает
+    connection.queries на каждом запросе тестового клиента.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def png_data_url():
+    buffer = BytesIO()
+    Image.new('RGB', (64, 64), 'orange').save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+def clear_caches():
+    """Холодный старт: пустой кэш и непостроенный индекс ингредиентов."""
+    cache.clear()
+    ingredient_index.invalidate()
+
+
+def count_queries(call):
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        status, size = call()
+    return status, size, counter.count
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, cwd=settings.BASE_DIR
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время ответа и число запросов к базе для каждого маршрута '
+        'api/urls.py с холодным и тёплым кэшем и пишет результат в JSON. '
+        'По умолчанию данные генерируются в транзакции и откатываются; '
+        'с --existing замер идёт на текущей базе (например, после '
+        'seed_fake). С --compare выводит разницу с прошлым прогоном.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--existing', action='store_true')
+        parser.add_argument('--recipes', type=int, default=10_000)
+        parser.add_argument('--users', type=int, default=1_000)
+        parser.add_argument('--tags', type=int, default=10)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=5)
+        parser.add_argument('--subscriptions-per-user', type=int, default=5)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--only', help='Подстрока названия: запустить часть сценариев.'
+        )
+        parser.add_argument('--output', default='bench_endpoints.json')
+        parser.add_argument(
+            '--compare', help='JSON прошлого прогона для сравнения.'
+        )
+
+    def handle(self, *args, **options):
+        previous = None
+        if options['compare']:
+            compare = Path(options['compare'])
+            if not compare.exists():
+                raise CommandError(f'Нет файла {compare}.')
+            previous = json.loads(compare.read_text())
+        # Свой кэш в памяти: записи о данных, которые будут откачены,
+        # не должны попасть в общий кэш развёртывания.
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+            ALLOWED_HOSTS=['*'],
+            MEDIA_ROOT=media_root,
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'bench-endpoints',
+            }},
+        ), transaction.atomic():
+            if not options['existing']:
+                self.seed(options)
+            values, client = self.prepare()
+            result = {
+                'commit': git_commit(),
+                'date': datetime.now(timezone.utc).isoformat(),
+                'database': connections['default'].vendor,
+                'recipes': Recipe.objects.count(),
+                'users': User.objects.count(),
+                'repeat': options['repeat'],
+                'scenarios': self.run(client, values, options),
+            }
+            transaction.set_rollback(True)
+        Path(options['output']).write_text(
+            json.dumps(result, ensure_ascii=False, indent=2)
+        )
+        self.report(result, previous)
+
+    def seed(self, options):
+        if not Ingredient.objects.exists():
+            Ingredient.objects.bulk_create(
+                Ingredient(name=word, measurement_unit='г')
+                for word in RECIPE_WORDS
+            )
+        seed_recipes(
+            options['recipes'],
+            options['users'],
+            options['tags'],
+            options['ingredients_per_recipe'],
+            subscriptions_per_user=options['subscriptions_per_user'],
+        )
+        recount()
+
+    def prepare(self):
+        """Пользователь с подписками и корзиной, токен и значения путей."""
+        user = (
+            User.objects.filter(users__isnull=False).order_by('pk').first()
+            or User.objects.order_by('pk').first()
+        )
+        recipe = Recipe.objects.first()
+        tag = Tag.objects.order_by('pk').first()
+        ingredient = Ingredient.objects.order_by('pk').first()
+        if None in (user, recipe, tag, ingredient):
+            raise CommandError(
+                'Нужны пользователь, рецепт, тег и ингредиент; '
+                'запустите seed_fake или уберите --existing.'
+            )
+        user.set_password(PASSWORD)
+        user.save()
+        # По одному, а не bulk_create: сигналы обновляют счётчики рецептов.
+        for pk in Recipe.objects.filter(
+            recipe_ingredients__isnull=False
+        ).values_list('pk', flat=True).distinct()[:CART_SIZE]:
+            ShoppingCartItem.objects.get_or_create(user=user, recipe_id=pk)
+        author = Subscribe.objects.filter(user=user).values_list(
+            'subscription', flat=True
+        ).first()
+        new_author = User.objects.exclude(pk=user.pk).exclude(
+            subscriptions__user=user
+        ).values_list('pk', flat=True).first()
+        token, _ = Token.objects.get_or_create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        values = {
+            'recipe': recipe.pk,
+            'new_recipe': Recipe.objects.exclude(
+                shopping_cart__user=user
+            ).values_list('pk', flat=True).first(),
+            'author': author or new_author,
+            'new_author': new_author,
+            'tag': tag.slug,
+            'tag_id': tag.pk,
+            'ingredient': ingredient.pk,
+            'ingredient_name': quote(ingredient.name[:3]),
+            'search': quote(recipe.name.split()[-1]),
+        }
+        image = png_data_url()
+        payloads = {
+            'recipe': {
+                'name': 'Рецепт для замера',
+                'text': 'Описание рецепта для замера.',
+                'cooking_time': 30,
+                'image': image,
+                'ingredients': [{'id': ingredient.pk, 'amount': 100}],
+            },
+            'user': {
+                'email': 'bench-new-user@example.com',
+                'username': 'bench-new-user',
+                'first_name': 'Новый',
+                'last_name': 'Пользователь',
+                'password': PASSWORD,
+            },
+            'avatar': {'avatar': image},
+            'password': {
+                'current_password': PASSWORD,
+                'new_password': PASSWORD[::-1],
+            },
+            'login': {'email': user.email, 'password': PASSWORD},
+        }
+        return {'paths': values, 'payloads': payloads}, client
+
+    def run(self, client, values, options):
+        scenarios = {}
+        for name, method, path, payload in SCENARIOS:
+            if options['only'] and options['only'] not in name:
+                continue
+            path = path.format(**values['paths'])
+            data = values['payloads'][payload] if payload else None
+
+            def call():
+                if method == 'get':
+                    return self.request(client, method, path, data)
+                with transaction.atomic():
+                    response = self.request(client, method, path, data)
+                    transaction.set_rollback(True)
+                return response
+
+            # Холодный замер очищает кэш перед каждым вызовом и платит
+            # за COUNT(*), справочники и сборку ленты; тёплый идёт после
+            # прогрева, как повторный запрос того же клиента.
+            clear_caches()
+            _, _, cold_queries = count_queries(call)
+            cold_ms, cold_p95_ms = measure(
+                call, options['repeat'], clear_caches
+            )
+            status, size, queries = count_queries(call)
+            median_ms, p95_ms = measure(call, options['repeat'])
+            scenarios[name] = {
+                'method': method.upper(),
+                'path': path,
+                'status': status,
+                'bytes': size,
+                'queries': queries,
+                'median_ms': round(median_ms, 2),
+                'p95_ms': round(p95_ms, 2),
+                'cold_queries': cold_queries,
+                'cold_median_ms': round(cold_ms, 2),
+                'cold_p95_ms': round(cold_p95_ms, 2),
+            }
+        return scenarios
+
+    @staticmethod
+    def request(client, method, path, data):
+        response = getattr(client, method)(path, data, format='json')
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        return response.status_code, size
+
+    def report(self, result, previous):
+        self.stdout.write(
+            f'{result["recipes"]} рецептов, {result["users"]} пользователей, '
+            f'{result["database"]}, коммит {result["commit"]}'
+        )
+        before = previous['scenarios'] if previous else {}
+        for name, stats in result['scenarios'].items():
+            line = (
+                f'{name}: {stats["status"]}, медиана {stats["median_ms"]:.1f} '
+                f'мс, p95 {stats["p95_ms"]:.1f} мс, '
+                f'запросов {stats["queries"]}, {stats["bytes"]} байт; '
+                f'холодный кэш: медиана {stats["cold_median_ms"]:.1f} мс, '
+                f'запросов {stats["cold_queries"]}'
+            )
+            old = before.get(name)
+            if old:
+                change = (
+                    stats['median_ms'] / old['median_ms'] - 1
+                    if old['median_ms'] else 0
+                )
+                line += (
+                    f' | было {old["median_ms"]:.1f} мс ({change:+.0%}), '
+                    f'запросов {old["queries"]}'
+                )
+            style = (
+                self.style.ERROR if stats['status'] >= 400
+                else self.style.SUCCESS
+            )
+            self.stdout.write(style(line))
@@ -0,0 +1,100 @@
+from time import perf_counter
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.benchmarks import measure, seed_recipes
+from api.models import User
+from api.views import RecipeViewSet
+
+SCENARIOS = {
+    'без фильтров': '',
+    'один тег': 'tags=bench-tag-0',
+    'три тега': 'tags=bench-tag-0&tags=bench-tag-1&tags=bench-tag-2',
+    'автор': 'author={author}',
+    'автор и теги': 'author={author}&tags=bench-tag-0&tags=bench-tag-1',
+    'избранное': 'is_favorited=1',
+    'корзина и тег': 'is_in_shopping_cart=1&tags=bench-tag-3',
+    'поиск': 'search=курицей',
+    'поиск двух слов': 'search=томатный+соус',
+    'поиск и тег': 'search=пироги&tags=bench-tag-0',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время фильтрованного списка рецептов на синтетических '
+        'данных. Данные создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100_000)
+        parser.add_argument('--users', type=int, default=1_000)
+        parser.add_argument('--tags', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--budget-ms',
+            type=float,
+            default=100,
+            help='Допустимая медиана времени ответа с холодным кэшем, мс.'
+        )
+
+    def handle(self, *args, **options):
+        # Свой кэш в памяти: замер очищает его между повторами, а записи
+        # об откатываемых данных не должны попасть в общий кэш.
+        with transaction.atomic(), override_settings(
+            ALLOWED_HOSTS=['*'],
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'bench-recipe-filters',
+            }},
+        ):
+            started = perf_counter()
+            user_ids = seed_recipes(
+                options['recipes'], options['users'], options['tags']
+            )
+            self.stdout.write(
+                f'Создано {options["recipes"]} рецептов за '
+                f'{perf_counter() - started:.1f} с'
+            )
+            over_budget = self.run(
+                User.objects.get(pk=user_ids[0]), options
+            )
+            transaction.set_rollback(True)
+        if over_budget:
+            raise CommandError(
+                f'Сценарии вне бюджета {options["budget_ms"]} мс: '
+                + ', '.join(over_budget)
+            )
+
+    def run(self, user, options):
+        factory = APIRequestFactory()
+        view = RecipeViewSet.as_view({'get': 'list'})
+        over_budget = []
+        for name, query in SCENARIOS.items():
+            request = factory.get(
+                '/api/recipes/?' + query.format(author=user.pk)
+            )
+            force_authenticate(request, user=user)
+
+            def call():
+                return view(request).render()
+
+            # Холодный замер платит и за COUNT(*), который пагинатор
+            # кэширует на минуту; тёплый показывает повторный запрос.
+            cold, cold_p95 = measure(call, options['repeat'], cache.clear)
+            warm, warm_p95 = measure(call, options['repeat'])
+            line = (
+                f'{name}: холодный кэш — медиана {cold:.1f} мс, '
+                f'p95 {cold_p95:.1f} мс; тёплый — медиана {warm:.1f} мс, '
+                f'p95 {warm_p95:.1f} мс'
+            )
+            if cold > options['budget_ms']:
+                over_budget.append(name)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(self.style.SUCCESS(line))
+        return over_budget
@@ -0,0 +1,62 @@
+from time import process_time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.benchmarks import seed_recipes
+from api.fast_serializers import RecipeListSerializer
+from api.models import Recipe, User
+from api.serializers import RecipeSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает процессорное время на один рецепт у RecipeSerializer '
+        'и быстрого RecipeListSerializer.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1_000)
+        parser.add_argument('--ingredients', type=int, default=8)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=['*']):
+            user_ids = seed_recipes(
+                options['recipes'], 100, 5, options['ingredients']
+            )
+            user = User.objects.get(pk=user_ids[0])
+            request = Request(APIRequestFactory().get('/api/recipes/'))
+            request.user = user
+            recipes = list(
+                Recipe.objects.filter(name__startswith='bench-')
+                .with_related().with_user_flags(user)
+            )
+            results = {}
+            for serializer_class in (RecipeSerializer, RecipeListSerializer):
+                results[serializer_class.__name__] = self.cpu_per_recipe(
+                    serializer_class, recipes, request, options['repeat']
+                )
+            transaction.set_rollback(True)
+        for name, microseconds in results.items():
+            self.stdout.write(f'{name}: {microseconds:.1f} мкс на рецепт')
+        self.stdout.write(self.style.SUCCESS(
+            'Ускорение: {:.1f}x'.format(
+                results['RecipeSerializer'] / results['RecipeListSerializer']
+            )
+        ))
+
+    @staticmethod
+    def cpu_per_recipe(serializer_class, recipes, request, repeat):
+        best = None
+        for _ in range(repeat):
+            started = process_time()
+            serializer_class(
+                recipes, many=True, context={'request': request}
+            ).data
+            elapsed = process_time() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best / len(recipes) * 1_000_000
@@ -0,0 +1,147 @@
+import asyncio
+import json
+from pathlib import Path
+from statistics import median
+from time import perf_counter
+from urllib.parse import quote, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks import p95
+from api.models import Ingredient, Recipe, Tag
+
+DEFAULT_PATHS = (
+    '/api/recipes/',
+    '/api/recipes/{recipe}/',
+    '/api/tags/',
+    '/api/tags/{tag}/',
+    '/api/ingredients/?name={ingredient}',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест запущенного сервера по горячим эндпоинтам чтения. '
+        'Запустите его против WSGI- и ASGI-развёртывания с разными --label: '
+        'результаты копятся в одном JSON-файле и выводятся рядом.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:9000')
+        parser.add_argument('--label', required=True)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument('--token', help='Токен для Authorization.')
+        parser.add_argument('--output', default='bench_serving.json')
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http':
+            raise CommandError('Поддерживается только http://.')
+        paths = self.get_paths()
+        result = asyncio.run(self.run(url, paths, options))
+        output = Path(options['output'])
+        results = json.loads(output.read_text()) if output.exists() else {}
+        results[options['label']] = result
+        output.write_text(json.dumps(results, ensure_ascii=False, indent=2))
+        for label, stats in results.items():
+            self.stdout.write(
+                f'{label}: {stats["rps"]:.0f} запросов/с, '
+                f'медиана {stats["median_ms"]:.1f} мс, '
+                f'p95 {stats["p95_ms"]:.1f} мс, ошибок {stats["errors"]} '
+                f'(параллельно {stats["concurrency"]})'
+            )
+
+    def get_paths(self):
+        values = {
+            'recipe': Recipe.objects.values_list('pk', flat=True).first(),
+            'tag': Tag.objects.values_list('pk', flat=True).first(),
+            'ingredient': Ingredient.objects.values_list(
+                'name', flat=True
+            ).first(),
+        }
+        if None in values.values():
+            raise CommandError(
+                'Нужны хотя бы один рецепт, тег и ингредиент в базе.'
+            )
+        values['ingredient'] = quote(values['ingredient'][:3])
+        return [path.format(**values) for path in DEFAULT_PATHS]
+
+    async def run(self, url, paths, options):
+        deadline = perf_counter() + options['duration']
+        timings = []
+        errors = []
+        started = perf_counter()
+        await asyncio.gather(*(
+            self.worker(number, url, paths, options, deadline, timings, errors)
+            for number in range(options['concurrency'])
+        ))
+        elapsed = perf_counter() - started
+        return {
+            'url': url.geturl(),
+            'concurrency': options['concurrency'],
+            'requests': len(timings),
+            'errors': len(errors),
+            'error_samples': sorted(set(errors))[:5],
+            'rps': len(timings) / elapsed,
+            'median_ms': median(timings) if timings else 0,
+            'p95_ms': p95(timings) if timings else 0,
+        }
+
+    async def worker(self, number, url, paths, options, deadline, timings,
+                     errors):
+        headers = f'Host: {url.netloc}\r\nConnection: keep-alive\r\n'
+        if options['token']:
+            headers += f'Authorization: Token {options["token"]}\r\n'
+        connection = None
+        request_number = number
+        while perf_counter() < deadline:
+            path = paths[request_number % len(paths)]
+            request_number += 1
+            started = perf_counter()
+            try:
+                if connection is None:
+                    connection = await asyncio.open_connection(
+                        url.hostname, url.port or 80
+                    )
+                status, keep_alive = await self.get(
+                    connection, path, headers
+                )
+            except (OSError, ValueError, asyncio.IncompleteReadError) as exc:
+                errors.append(repr(exc))
+                connection = None
+                continue
+            if status != 200:
+                errors.append(f'{path}: {status}')
+            timings.append((perf_counter() - started) * 1000)
+            if not keep_alive:
+                # Синхронные воркеры gunicorn закрывают соединение
+                # после каждого ответа.
+                connection[1].close()
+                connection = None
+        if connection is not None:
+            connection[1].close()
+
+    @staticmethod
+    async def get(connection, path, headers):
+        """GET по keep-alive соединению; тело читается по Content-Length.
+
+        Возвращает статус и признак того, что соединение можно
+        использовать повторно.
+        """
+        reader, writer = connection
+        writer.write(f'GET {path} HTTP/1.1\r\n{headers}\r\n'.encode())
+        await writer.drain()
+        head = await reader.readuntil(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        status = int(lines[0].split()[1])
+        response_headers = {
+            name.strip().lower(): value.strip()
+            for name, _, value in (line.partition(':') for line in lines[1:])
+        }
+        if 'content-length' not in response_headers:
+            raise ValueError('Ответ без Content-Length.')
+        await reader.readexactly(int(response_headers['content-length']))
+        return status, (
+            response_headers.get('connection', '').lower() != 'close'
+        )
@@ -0,0 +1,138 @@
+import csv
+import json
+from pathlib import Path
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from api.cache import invalidate_reference_cache
+from api.models import Ingredient
+from api.utils import batches
+
+DEFAULT_PATH = settings.BASE_DIR.parent / 'data' / 'ingredients.csv'
+BATCH_SIZE = 1000
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(path):
+    with open(path, encoding='utf-8', newline='') as file:
+        for row in csv.reader(file):
+            if len(row) >= 2:
+                yield row[0], row[1]
+
+
+def read_json(path):
+    """Читает JSON-массив объектов по одному, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    with open(path, encoding='utf-8') as file:
+        buffer = ''
+        opened = False
+        while True:
+            chunk = file.read(JSON_CHUNK_SIZE)
+            buffer += chunk
+            while True:
+                buffer = buffer.lstrip()
+                if not opened:
+                    if not buffer:
+                        break
+                    if buffer[0] != '[':
+                        raise CommandError(f'{path}: ожидался JSON-массив.')
+                    buffer = buffer[1:]
+                    opened = True
+                    continue
+                buffer = buffer.lstrip(',').lstrip()
+                if not buffer or buffer[0] == ']':
+                    break
+                try:
+                    item, end = decoder.raw_decode(buffer)
+                except json.JSONDecodeError:
+                    # Объект разрезан границей чанка — дочитываем файл.
+                    if not chunk:
+                        raise CommandError(f'{path}: некорректный JSON.')
+                    break
+                buffer = buffer[end:]
+                yield item['name'], item['measurement_unit']
+            if not chunk or buffer.startswith(']'):
+                return
+
+
+READERS = {
+    '.csv': read_csv,
+    '.json': read_json,
+}
+
+
+def unique_rows(rows):
+    seen = set()
+    for name, measurement_unit in rows:
+        key = (name.strip(), measurement_unit.strip())
+        if key[0] and key not in seen:
+            seen.add(key)
+            yield key
+
+
+class Command(BaseCommand):
+    help = 'Загружает ингредиенты из CSV- или JSON-файла.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='*',
+            default=[DEFAULT_PATH],
+            help='Файлы .csv (name,measurement_unit) или .json.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--upsert',
+            action='store_true',
+            help='Пропускать уже загруженные ингредиенты: повторная загрузка '
+                 'того же файла ничего не меняет.'
+        )
+
+    def handle(self, *args, **options):
+        for path in map(Path, options['paths']):
+            reader = READERS.get(path.suffix.lower())
+            if reader is None:
+                raise CommandError(f'{path}: неизвестный формат файла.')
+            if not path.exists():
+                raise CommandError(f'{path}: файл не найден.')
+            started = perf_counter()
+            try:
+                with transaction.atomic():
+                    total = self.load(
+                        unique_rows(reader(path)),
+                        options['batch_size'],
+                        options['upsert']
+                    )
+            except IntegrityError:
+                raise CommandError(
+                    f'{path}: часть ингредиентов уже есть в базе, '
+                    'используйте --upsert.'
+                )
+            # bulk_create не вызывает сигналы: новое поколение справочника
+            # сбрасывает кэш ответов и индексы поиска во всех процессах.
+            invalidate_reference_cache(Ingredient)
+            elapsed = perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(
+                f'{path.name}: обработано {total} строк за {elapsed:.2f} с '
+                f'({total / elapsed if elapsed else total:.0f} строк/с)'
+            ))
+
+    def load(self, rows, batch_size, upsert):
+        total = 0
+        for batch in batches(rows, batch_size):
+            Ingredient.objects.bulk_create(
+                [
+                    Ingredient(name=name, measurement_unit=measurement_unit)
+                    for name, measurement_unit in batch
+                ],
+                ignore_conflicts=upsert,
+            )
+            total += len(batch)
+        return total
@@ -0,0 +1,24 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import Recipe, RecipeSearchTerm
+from api.search import build_search_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает поисковый индекс рецептов. Нужен после массовой '
+        'загрузки через bulk_create, которая не вызывает сигналы.'
+    )
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        with transaction.atomic():
+            RecipeSearchTerm.objects.all().delete()
+            build_search_index(Recipe.objects.all())
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано рецептов: {Recipe.objects.count()} '
+            f'за {perf_counter() - started:.1f} с'
+        ))
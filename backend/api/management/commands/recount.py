@@ -0,0 +1,21 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.counters import recount
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики избранного, списков покупок и рецептов '
+        'автора. Исправляет расхождения после массовых загрузок и удалений.'
+    )
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        with transaction.atomic():
+            recount()
+        self.stdout.write(self.style.SUCCESS(
+            f'Счётчики пересчитаны за {perf_counter() - started:.1f} с'
+        ))
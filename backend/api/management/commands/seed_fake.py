@@ -0,0 +1,59 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.benchmarks import seed_recipes
+from api.cache import invalidate_reference_cache
+from api.counters import recount
+from api.models import Tag, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, тегами, рецептами, '
+        'подписками, избранным и списками покупок. Данные остаются в базе: '
+        'на них запускаются bench_endpoints и нагрузочные тесты.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1_000)
+        parser.add_argument('--recipes', type=int, default=10_000)
+        parser.add_argument('--tags', type=int, default=10)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=5)
+        parser.add_argument('--favorites-per-recipe', type=int, default=1)
+        parser.add_argument('--subscriptions-per-user', type=int, default=5)
+        parser.add_argument(
+            '--prefix',
+            default='fake',
+            help='Префикс имён; для повторного запуска нужен новый.'
+        )
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if options['users'] < 1 or options['tags'] < 1:
+            raise CommandError('Нужны хотя бы один пользователь и один тег.')
+        if User.objects.filter(username=f'{prefix}-0').exists():
+            raise CommandError(
+                f'Данные с префиксом {prefix!r} уже есть, укажите --prefix.'
+            )
+        started = perf_counter()
+        with transaction.atomic():
+            seed_recipes(
+                options['recipes'],
+                options['users'],
+                options['tags'],
+                options['ingredients_per_recipe'],
+                prefix=prefix,
+                favorites_per_recipe=options['favorites_per_recipe'],
+                subscriptions_per_user=options['subscriptions_per_user'],
+            )
+            # bulk_create не вызывает сигналы, счётчики считаются разом.
+            recount()
+        # Теги тоже созданы через bulk_create: сбрасываем кэш ответов.
+        invalidate_reference_cache(Tag)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано {options["users"]} пользователей и '
+            f'{options["recipes"]} рецептов за '
+            f'{perf_counter() - started:.1f} с'
+        ))
@@ -0,0 +1,255 @@
+"""Метрики запросов по действиям вью в формате Prometheus.
+
+MetricsMiddleware замеряет время ответа, время и число запросов к базе
+и размер тела; гистограммы копятся в памяти процесса по ключу
+(действие, метод). Запросы к базе считает обёртка count_query, которую
+сигнал connection_created ставит на каждое соединение.
+
+Если задан METRICS_DIR, процесс не чаще раза в METRICS_FLUSH_INTERVAL
+секунд сбрасывает свой снимок в файл каталога, а /api/_metrics
+складывает файлы всех воркеров. Каталог очищается при старте
+развёртывания, как в мультипроцессном режиме prometheus_client.
+"""
+import json
+import logging
+import os
+import threading
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+from time import monotonic, perf_counter
+from uuid import uuid4
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+PREFIX = 'foodgram_http'
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+HISTOGRAMS = {
+    'request_duration_seconds': (
+        'Время обработки запроса, с.', SECONDS_BUCKETS
+    ),
+    'request_db_seconds': (
+        'Время запросов к базе за один запрос, с.', SECONDS_BUCKETS
+    ),
+    'request_queries': (
+        'Число запросов к базе за один запрос.',
+        (0, 1, 2, 3, 5, 10, 20, 50, 100)
+    ),
+    'response_size_bytes': (
+        'Размер тела ответа, байт.',
+        (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+    ),
+}
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+logger = logging.getLogger(__name__)
+
+request_stats = ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+def count_query(execute, sql, params, many, context):
+    """execute_wrapper: время и число запросов текущего HTTP-запроса.
+
+    Контекстная переменная доходит и до потоков sync_to_async, поэтому
+    запросы async-вью тоже попадают в замер.
+    """
+    stats = request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += perf_counter() - started
+
+
+def view_label(request):
+    """RecipeViewSet.list, TokenCreateView или имя маршрута."""
+    match = request.resolver_match
+    if match is None:
+        return 'unresolved'
+    view = match.func
+    view_class = getattr(view, 'cls', None)
+    actions = getattr(view, 'actions', None)
+    if view_class is not None and actions:
+        method = request.method.lower()
+        return f'{view_class.__name__}.{actions.get(method, method)}'
+    if view_class is not None:
+        return view_class.__name__
+    return match.view_name or match._func_path
+
+
+class MetricsRegistry:
+    """Счётчики и гистограммы процесса.
+
+    Гистограмма ряда — список: число наблюдений в каждой корзине,
+    включая +Inf, и последним элементом сумма значений.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.requests = Counter()
+        self.histograms = {name: {} for name in HISTOGRAMS}
+        self.flushed_at = monotonic()
+        self.pid = None
+        self.path = None
+
+    def observe(self, view, method, status, duration, stats, size):
+        values = {
+            'request_duration_seconds': duration,
+            'request_db_seconds': stats.db_time,
+            'request_queries': stats.queries,
+            'response_size_bytes': size,
+        }
+        key = (view, method)
+        with self.lock:
+            self.requests[(view, method, str(status))] += 1
+            for name, value in values.items():
+                buckets = HISTOGRAMS[name][1]
+                series = self.histograms[name].get(key)
+                if series is None:
+                    series = [0] * (len(buckets) + 2)
+                    self.histograms[name][key] = series
+                series[bisect_left(buckets, value)] += 1
+                series[-1] += value
+        elapsed = monotonic() - self.flushed_at
+        if settings.METRICS_DIR and elapsed >= settings.METRICS_FLUSH_INTERVAL:
+            # Если файл уже пишет другой поток, запрос его не ждёт.
+            self.flush(blocking=False)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'requests': [
+                    [*key, count] for key, count in self.requests.items()
+                ],
+                'histograms': {
+                    name: [
+                        [*key, list(series)] for key, series in rows.items()
+                    ]
+                    for name, rows in self.histograms.items()
+                },
+            }
+
+    def flush(self, blocking=True):
+        """Атомарно переписывает файл процесса в METRICS_DIR.
+
+        Запись и os.replace идут под flush_lock, иначе потоки делят один
+        временный файл и os.replace второго падает с FileNotFoundError.
+        Ошибки записи только логируются: метрики не должны ронять запрос.
+        """
+        if not self.flush_lock.acquire(blocking):
+            return
+        try:
+            self.flushed_at = monotonic()
+            if self.pid != os.getpid():
+                # Свой файл у каждого процесса; суффикс не даёт новому
+                # воркеру с тем же pid затереть итоги завершившегося.
+                self.pid = os.getpid()
+                self.path = Path(settings.METRICS_DIR) / (
+                    f'{self.pid}-{uuid4().hex[:8]}.json'
+                )
+            # Каталог могут очистить вместе с файлами при развёртывании.
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = self.path.with_suffix('.tmp')
+            temporary.write_text(json.dumps(self.snapshot()))
+            os.replace(temporary, self.path)
+        except OSError:
+            logger.exception('Не удалось записать метрики в %s', self.path)
+        finally:
+            self.flush_lock.release()
+
+    def collect(self):
+        """Снимки всех процессов, если задан METRICS_DIR, иначе свой."""
+        if not settings.METRICS_DIR:
+            return [self.snapshot()]
+        self.flush()
+        snapshots = []
+        for path in Path(settings.METRICS_DIR).glob('*.json'):
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+
+registry = MetricsRegistry()
+
+
+def format_labels(**labels):
+    return '{' + ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n')
+        )
+        for name, value in labels.items()
+    ) + '}'
+
+
+def render(snapshots):
+    """Текстовый формат Prometheus по сумме снимков."""
+    requests = Counter()
+    histograms = {name: {} for name in HISTOGRAMS}
+    for snapshot in snapshots:
+        for view, method, status, count in snapshot['requests']:
+            requests[(view, method, status)] += count
+        for name, rows in snapshot['histograms'].items():
+            if name not in histograms:
+                continue
+            for view, method, series in rows:
+                current = histograms[name].get((view, method))
+                histograms[name][(view, method)] = (
+                    [a + b for a, b in zip(current, series)]
+                    if current else series
+                )
+    metric = f'{PREFIX}_requests_total'
+    lines = [
+        f'# HELP {metric} Число запросов.',
+        f'# TYPE {metric} counter',
+    ]
+    for (view, method, status), count in sorted(requests.items()):
+        labels = format_labels(view=view, method=method, status=status)
+        lines.append(f'{metric}{labels} {count}')
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        metric = f'{PREFIX}_{name}'
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} histogram']
+        for (view, method), series in sorted(histograms[name].items()):
+            total = 0
+            for bound, count in zip((*buckets, '+Inf'), series):
+                total += count
+                labels = format_labels(view=view, method=method, le=bound)
+                lines.append(f'{metric}_bucket{labels} {total}')
+            labels = format_labels(view=view, method=method)
+            lines.append(f'{metric}_sum{labels} {series[-1]}')
+            lines.append(f'{metric}_count{labels} {total}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """Отдаёт метрики по токену METRICS_TOKEN или внутренним адресам."""
+    if settings.METRICS_TOKEN:
+        allowed = constant_time_compare(
+            request.headers.get('Authorization', ''),
+            f'Bearer {settings.METRICS_TOKEN}'
+        )
+    else:
+        allowed = (
+            request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+        )
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(render(registry.collect()), content_type=CONTENT_TYPE)
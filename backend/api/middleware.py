@@ -0,0 +1,346 @@
+import asyncio
+import atexit
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async
+)
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponseNotFound, HttpResponseRedirect
+from django.utils.cache import patch_cache_control
+
+from api.metrics import RequestStats, registry, request_stats, view_label
+from api.profiling import (
+    PROFILE_HEADER,
+    RequestProfile,
+    is_staff,
+    profile_requested,
+    sampled
+)
+from api.short_links import SHORT_LINK_PATH, short_links
+
+
+class RequestStartMiddleware:
+    """Запоминает в request.started_at время прихода запроса.
+
+    Стоит первым в MIDDLEWARE: замеры во вью, например время до первого
+    байта выгрузки, считаются с учётом всей цепочки middleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.started_at = perf_counter()
+        # В async-цепочке get_response возвращает корутину, её дождётся
+        # вызывающий обработчик.
+        return self.get_response(request)
+
+
+class ShortLinkMiddleware:
+    """Отвечает на /s/<code> редиректом на страницу рецепта.
+
+    Стоит сразу после RequestStartMiddleware: запрос не проходит
+    ни сессии, ни аутентификацию, ни URL-резолвер и DRF. Код ищется
+    в словаре процесса, промах — один запрос к базе по уникальному индексу.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        match = SHORT_LINK_PATH.fullmatch(request.path_info)
+        if match is None:
+            return self.get_response(request)
+        code = match['code']
+        return self.redirect(short_links.get(code) or short_links.load(code))
+
+    async def __acall__(self, request):
+        match = SHORT_LINK_PATH.fullmatch(request.path_info)
+        if match is None:
+            return await self.get_response(request)
+        code = match['code']
+        recipe_id = short_links.get(code)
+        if recipe_id is None:
+            recipe_id = await sync_to_async(short_links.load)(code)
+        return self.redirect(recipe_id)
+
+    @staticmethod
+    def redirect(recipe_id):
+        if recipe_id is None:
+            return HttpResponseNotFound()
+        response = HttpResponseRedirect(
+            settings.SHORT_LINK_REDIRECT.format(id=recipe_id)
+        )
+        # Код навсегда указывает на один рецепт: пусть CDN и браузеры
+        # принимают всплески переходов на себя.
+        patch_cache_control(
+            response, public=True, max_age=settings.SHORT_LINK_MAX_AGE
+        )
+        return response
+
+
+class MetricsMiddleware:
+    """Время ответа, запросы к базе и размер тела по действию вью.
+
+    Выключенный (METRICS_ENABLED=False) исключается из цепочки при
+    загрузке и ничего не стоит. Потоковый ответ замеряется, когда тело
+    дочитано: запросы к базе при отдаче тоже попадают в его счёт.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        if settings.METRICS_DIR:
+            atexit.register(registry.flush)
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = perf_counter()
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_stats.reset(token)
+        return self.observe(request, response, stats, started)
+
+    async def __acall__(self, request):
+        started = perf_counter()
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_stats.reset(token)
+        return self.observe(request, response, stats, started)
+
+    def observe(self, request, response, stats, started):
+        labels = (view_label(request), request.method)
+        if not response.streaming:
+            registry.observe(
+                *labels, response.status_code, perf_counter() - started,
+                stats, len(response.content)
+            )
+            return response
+        stream = (
+            self.observe_async_stream if response.is_async
+            else self.observe_stream
+        )
+        response.streaming_content = stream(
+            response.streaming_content, labels, response.status_code, stats,
+            started
+        )
+        return response
+
+    @staticmethod
+    def observe_stream(content, labels, status, stats, started):
+        iterator = iter(content)
+        size = 0
+        try:
+            while True:
+                token = request_stats.set(stats)
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    request_stats.reset(token)
+                size += len(chunk)
+                yield chunk
+        finally:
+            registry.observe(
+                *labels, status, perf_counter() - started, stats, size
+            )
+
+    @staticmethod
+    async def observe_async_stream(content, labels, status, stats, started):
+        iterator = content.__aiter__()
+        size = 0
+        try:
+            while True:
+                token = request_stats.set(stats)
+                try:
+                    chunk = await iterator.__anext__()
+                except StopAsyncIteration:
+                    return
+                finally:
+                    request_stats.reset(token)
+                size += len(chunk)
+                yield chunk
+        finally:
+            registry.observe(
+                *labels, status, perf_counter() - started, stats, size
+            )
+
+
+class ProfileLoop:
+    """Свой поток и цикл событий профилируемого запроса под ASGI.
+
+    В нём выполняются и вью, и тело асинхронного потокового ответа:
+    генератор тела работает в том же цикле, что и создавшая его вью,
+    а cProfile, который видит только свой поток, — только этот запрос.
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='profile'
+        )
+        self.context = contextvars.copy_context()
+
+    def _run(self, function, *args):
+        async def call():
+            return await function(*args)
+
+        with self.profile.active():
+            return self.loop.run_until_complete(call())
+
+    async def run(self, function, *args):
+        """Ожидает function(*args) в цикле профиля и возвращает результат."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, self.context.run, self._run, function, *args
+        )
+
+    def _close(self):
+        try:
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+        finally:
+            self.loop.close()
+
+    async def close(self):
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                self.executor, self._close
+            )
+        finally:
+            self.executor.shutdown(wait=False)
+
+
+class ProfilingMiddleware:
+    """Профилирует запрос сотрудника с флагом или случайную долю запросов.
+
+    Стоит после AuthenticationMiddleware: сотрудник определяется по
+    сессии или токену до вызова вью. Потоковый ответ профилируется
+    до конца тела. cProfile видит только свой поток, поэтому под ASGI
+    профилируемый запрос вместе с асинхронным телом ответа выполняется
+    в ProfileLoop: чужие запросы общего цикла в профиль не попадают,
+    а два профиля не мешают друг другу. SQL из потоков sync_to_async
+    записывается полностью.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        reason = (
+            'staff' if profile_requested(request) and is_staff(request)
+            else 'sample' if sampled() else None
+        )
+        if reason is None:
+            return self.get_response(request)
+        profile = RequestProfile(reason)
+        with profile.active():
+            response = self.get_response(request)
+        response[f'{PROFILE_HEADER}-Id'] = profile.id
+        if response.streaming and not response.is_async:
+            response.streaming_content = self.profile_stream(
+                profile, response.streaming_content, request, response
+            )
+        else:
+            profile.save(request, response)
+        return response
+
+    async def __acall__(self, request):
+        reason = (
+            'staff' if profile_requested(request)
+            and await sync_to_async(is_staff)(request)
+            else 'sample' if sampled() else None
+        )
+        if reason is None:
+            return await self.get_response(request)
+        profile = RequestProfile(reason)
+        loop = ProfileLoop(profile)
+        try:
+            response = await loop.run(self.get_response, request)
+        except BaseException:
+            await loop.close()
+            raise
+        response[f'{PROFILE_HEADER}-Id'] = profile.id
+        if response.streaming and response.is_async:
+            response.streaming_content = self.profile_async_stream(
+                loop, response.streaming_content, request, response
+            )
+            return response
+        await loop.close()
+        if response.streaming:
+            response.streaming_content = self.profile_stream(
+                profile, response.streaming_content, request, response
+            )
+        else:
+            await sync_to_async(profile.save)(request, response)
+        return response
+
+    @staticmethod
+    def profile_stream(profile, content, request, response):
+        iterator = iter(content)
+        try:
+            while True:
+                with profile.active():
+                    chunk = next(iterator, None)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            profile.save(request, response)
+
+    @staticmethod
+    async def profile_async_stream(loop, content, request, response):
+        iterator = content.__aiter__()
+        try:
+            while True:
+                try:
+                    chunk = await loop.run(iterator.__anext__)
+                except StopAsyncIteration:
+                    return
+                yield chunk
+        finally:
+            try:
+                await loop.run(iterator.aclose)
+            finally:
+                await loop.close()
+            await sync_to_async(loop.profile.save)(request, response)
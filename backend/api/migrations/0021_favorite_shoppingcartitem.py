@@ -0,0 +1,97 @@
+# Generated by Django 4.2.20 on 2026-10-18 18:43
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def copy_user_recipes(apps, schema_editor):
+    Recipe = apps.get_model('api', 'Recipe')
+    for model_name, field in (
+        ('Favorite', 'favourites'),
+        ('ShoppingCartItem', 'shopping_cart'),
+    ):
+        model = apps.get_model('api', model_name)
+        model.objects.bulk_create(
+            (
+                model(user_id=user_id, recipe_id=recipe_id)
+                for recipe_id, user_id in Recipe.objects.filter(
+                    **{f'{field}__isnull': False}
+                ).values_list('id', f'{field}_id').iterator()
+            ),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_recipe_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Favorite',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ],
+            options={
+                'verbose_name': 'избранное',
+                'verbose_name_plural': 'Избранное',
+                'abstract': False,
+                'default_related_name': 'favorites',
+            },
+        ),
+        migrations.CreateModel(
+            name='ShoppingCartItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ],
+            options={
+                'verbose_name': 'рецепт в списке покупок',
+                'verbose_name_plural': 'Списки покупок',
+                'abstract': False,
+                'default_related_name': 'shopping_cart',
+            },
+        ),
+        migrations.AddField(
+            model_name='shoppingcartitem',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.recipe', verbose_name='Рецепт'),
+        ),
+        migrations.AddField(
+            model_name='shoppingcartitem',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AddField(
+            model_name='favorite',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.recipe', verbose_name='Рецепт'),
+        ),
+        migrations.AddField(
+            model_name='favorite',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcartitem',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_shoppingcartitem'),
+        ),
+        migrations.AddConstraint(
+            model_name='favorite',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_favorite'),
+        ),
+        migrations.RunPython(copy_user_recipes, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='recipe',
+            name='favourites',
+        ),
+        migrations.RemoveField(
+            model_name='recipe',
+            name='shopping_cart',
+        ),
+        migrations.DeleteModel(
+            name='ShopCart',
+        ),
+    ]
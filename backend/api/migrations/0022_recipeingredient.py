@@ -0,0 +1,63 @@
+# Generated by Django 4.2.20 on 2026-10-18 18:44
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def copy_recipe_ingredients(apps, schema_editor):
+    # У старой связи не было количества, переносим с amount=1.
+    Recipe = apps.get_model('api', 'Recipe')
+    RecipeIngredient = apps.get_model('api', 'RecipeIngredient')
+    RecipeIngredient.objects.bulk_create(
+        (
+            RecipeIngredient(
+                recipe_id=link.recipe_id,
+                ingredient_id=link.ingredient_id,
+                amount=1,
+            )
+            for link in Recipe.ingredients.through.objects.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_favorite_shoppingcartitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1)], verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_ingredients', to='api.ingredient', verbose_name='Ингредиент')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_ingredients', to='api.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'ингредиент рецепта',
+                'verbose_name_plural': 'Ингредиенты рецептов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recipeingredient',
+            index=models.Index(fields=['recipe', 'ingredient', 'amount'], name='recipe_ingredient_amount_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipeingredient',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='unique_recipe_ingredient'),
+        ),
+        migrations.RunPython(copy_recipe_ingredients, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='recipe',
+            name='ingredients',
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredients',
+            field=models.ManyToManyField(related_name='ingredients', through='api.RecipeIngredient', to='api.ingredient', verbose_name='ингредиенты'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.20 on 2026-10-18 18:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Только разбор текста: индекс должен совпадать с тем, как разбирается
+# поисковый запрос. Выборка и запись — на исторических моделях.
+from api.search import document_terms
+
+BATCH_SIZE = 1000
+
+
+def build_index(apps, schema_editor):
+    Recipe = apps.get_model('api', 'Recipe')
+    RecipeSearchTerm = apps.get_model('api', 'RecipeSearchTerm')
+    RecipeSearchTerm.objects.bulk_create(
+        (
+            RecipeSearchTerm(recipe_id=recipe.pk, term=term, weight=weight)
+            for recipe in Recipe.objects.prefetch_related(
+                'ingredients'
+            ).iterator(chunk_size=BATCH_SIZE)
+            for term, weight in document_terms(
+                recipe.name,
+                recipe.text,
+                [ingredient.name for ingredient in recipe.ingredients.all()]
+            ).items()
+        ),
+        batch_size=BATCH_SIZE
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_recipeingredient'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Основа слова')),
+                ('weight', models.PositiveSmallIntegerField(verbose_name='Вес')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='api.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'слово поиска',
+                'verbose_name_plural': 'Поисковый индекс',
+                'indexes': [models.Index(fields=['term', 'recipe', 'weight'], name='recipe_search_term_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='recipesearchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'recipe'), name='unique_recipe_search_term'),
+        ),
+        migrations.RunPython(build_index, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,29 @@
 from django.contrib.auth.models import AbstractUser
+from django.core.validators import MinValueValidator
 from django.db import models
 
 
-class User(AbstractUser):
+class CounterFieldsMixin:
+    """Не перезаписывает счётчики при обычном save().
+
+    Счётчики меняются только атомарными UPDATE ... SET x = x + 1 из
+    api.counters, поэтому save() загруженного ранее объекта не должен
+    затирать их устаревшими значениями.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(CounterFieldsMixin, AbstractUser):
     email = models.EmailField(
         blank=True,
         unique=True
@@ -12,8 +33,14 @@ class User(AbstractUser):
         blank=True,
         default=None
     )
+    recipes_count = models.PositiveIntegerField(
+        'Число рецептов',
+        default=0,
+        editable=False
+    )
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
+    counter_fields = ('recipes_count',)
 
 
 class Tag(models.Model):
@@ -51,9 +78,46 @@ class Ingredient(models.Model):
     class Meta:
         verbose_name = 'ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient_unit'
+            )
+        ]
+
 
+class RecipeQuerySet(models.QuerySet):
 
-class Recipe(models.Model):
+    def with_related(self):
+        return self.select_related('author', 'tags').prefetch_related(
+            models.Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            )
+        )
+
+    def with_user_flags(self, user):
+        """Флаги текущего пользователя одним запросом через EXISTS."""
+        if user.is_anonymous:
+            return self.annotate(
+                is_favorited=models.Value(False),
+                is_in_shopping_cart=models.Value(False),
+                author_is_subscribed=models.Value(False),
+            )
+        return self.annotate(
+            is_favorited=models.Exists(Favorite.objects.filter(
+                user=user, recipe=models.OuterRef('pk')
+            )),
+            is_in_shopping_cart=models.Exists(ShoppingCartItem.objects.filter(
+                user=user, recipe=models.OuterRef('pk')
+            )),
+            author_is_subscribed=models.Exists(Subscribe.objects.filter(
+                user=user, subscription=models.OuterRef('author')
+            )),
+        )
+
+
+class Recipe(CounterFieldsMixin, models.Model):
     tags = models.ForeignKey(
         Tag,
         verbose_name='Тэг',
@@ -69,25 +133,10 @@ class Recipe(models.Model):
     )
     ingredients = models.ManyToManyField(
         Ingredient,
+        through='RecipeIngredient',
         verbose_name='ингредиенты',
         related_name='ingredients',
     )
-    favourites = models.ForeignKey(
-        User,
-        verbose_name='Кто добавил в избранное',
-        on_delete=models.SET_NULL,
-        null=True,
-        blank=True,
-        related_name='favourites',
-    )
-    shopping_cart = models.ForeignKey(
-        User,
-        verbose_name='В чьих корзинах лежит',
-        on_delete=models.SET_NULL,
-        null=True,
-        blank=True,
-        related_name='cart',
-    )
     name = models.CharField(
         max_length=128,
         verbose_name='Название рецепта',
@@ -104,10 +153,136 @@ class Recipe(models.Model):
     cooking_time = models.PositiveSmallIntegerField(
         verbose_name='Время приготовления в минутах',
     )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации',
+        auto_now_add=True,
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0,
+        editable=False,
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        verbose_name='В списках покупок',
+        default=0,
+        editable=False,
+    )
+
+    objects = RecipeQuerySet.as_manager()
+    counter_fields = ('favorites_count', 'shopping_cart_count')
 
     class Meta:
         verbose_name = 'рецепт'
         verbose_name_plural = 'Рецепты'
+        ordering = ('-pub_date', 'id')
+        indexes = [
+            models.Index(
+                fields=['-pub_date', 'id'],
+                name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='recipe_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['tags', '-pub_date'],
+                name='recipe_tags_pub_date_idx'
+            ),
+        ]
+
+
+class RecipeIngredient(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE,
+        related_name='recipe_ingredients',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        verbose_name='Ингредиент',
+        on_delete=models.CASCADE,
+        related_name='recipe_ingredients',
+    )
+    amount = models.PositiveSmallIntegerField(
+        verbose_name='Количество',
+        validators=[MinValueValidator(1)],
+    )
+
+    class Meta:
+        verbose_name = 'ингредиент рецепта'
+        verbose_name_plural = 'Ингредиенты рецептов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'ingredient'],
+                name='unique_recipe_ingredient'
+            )
+        ]
+        # amount в ключе делает индекс покрывающим на любой СУБД: состав
+        # рецепта и суммы для списка покупок читаются из одного индекса.
+        indexes = [
+            models.Index(
+                fields=['recipe', 'ingredient', 'amount'],
+                name='recipe_ingredient_amount_idx'
+            ),
+        ]
+
+
+class RecipeSearchTerm(models.Model):
+    """Обратный индекс поиска: основа слова и её вес в рецепте.
+
+    Строки пересобираются api.search.index_recipe после сохранения рецепта.
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+    )
+    term = models.CharField(
+        max_length=64,
+        verbose_name='Основа слова',
+    )
+    weight = models.PositiveSmallIntegerField(
+        verbose_name='Вес',
+    )
+
+    class Meta:
+        verbose_name = 'слово поиска'
+        verbose_name_plural = 'Поисковый индекс'
+        # term первым в ключе: поиск читает индекс диапазоном по основе,
+        # weight в ключе избавляет от обращения к таблице при ранжировании.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'recipe'],
+                name='unique_recipe_search_term'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['term', 'recipe', 'weight'],
+                name='recipe_search_term_idx'
+            ),
+        ]
+
+
+class ShortLink(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE,
+        related_name='short_link',
+    )
+    code = models.CharField(
+        max_length=16,
+        unique=True,
+        verbose_name='Код',
+    )
+
+    class Meta:
+        verbose_name = 'короткая ссылка'
+        verbose_name_plural = 'Короткие ссылки'
 
 
 class Subscribe(models.Model):
@@ -131,16 +306,42 @@ class Subscribe(models.Model):
         ]
 
 
-class ShopCart(models.Model):
-    owner = models.ForeignKey(
+class UserRecipe(models.Model):
+    """Связь пользователь—рецепт; уникальный индекс (user, recipe)
+    отвечает и за проверку членства, и за выборку рецептов пользователя."""
+
+    user = models.ForeignKey(
         User,
+        verbose_name='Пользователь',
         on_delete=models.CASCADE,
-        null=True,
-        blank=True
     )
-    staff = models.ForeignKey(
-        Ingredient,
-        on_delete=models.SET_NULL,
-        null=True,
-        blank=True
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE,
     )
+
+    class Meta:
+        abstract = True
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_%(class)s'
+            )
+        ]
+
+
+class Favorite(UserRecipe):
+
+    class Meta(UserRecipe.Meta):
+        verbose_name = 'избранное'
+        verbose_name_plural = 'Избранное'
+        default_related_name = 'favorites'
+
+
+class ShoppingCartItem(UserRecipe):
+
+    class Meta(UserRecipe.Meta):
+        verbose_name = 'рецепт в списке покупок'
+        verbose_name_plural = 'Списки покупок'
+        default_related_name = 'shopping_cart'
@@ -0,0 +1,148 @@
+from hashlib import md5
+
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from django.utils.translation import gettext as _
+from rest_framework.pagination import (
+    BasePagination,
+    CursorPagination,
+    PageNumberPagination
+)
+
+PAGE_SIZE = 6
+MAX_PAGE_SIZE = 100
+COUNT_CACHE_TIMEOUT = 60
+# Ниже этого числа строк оценке не доверяем: точный COUNT(*) дёшев.
+ESTIMATED_COUNT_THRESHOLD = 10_000
+
+
+def count_cache_key(queryset):
+    sql, params = queryset.query.sql_with_params()
+    return 'count:' + md5(f'{sql}{params}'.encode()).hexdigest()
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, который кэширует COUNT(*) на COUNT_CACHE_TIMEOUT секунд.
+
+    Листание страниц не пересчитывает всю таблицу на каждый запрос.
+    Кэшированное число не ограничивает выборку: страница читается
+    с одной лишней строкой, по ней видно, есть ли следующая. На последней
+    странице count точный и без COUNT(*), на остальных не меньше уже
+    прочитанного.
+    """
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, 'query'):
+            return super().count
+        return cache.get_or_set(
+            count_cache_key(self.object_list),
+            lambda: super(CachedCountPaginator, self).count,
+            COUNT_CACHE_TIMEOUT
+        )
+
+    def page(self, number):
+        if not hasattr(self.object_list, 'query'):
+            return super().page(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_('That page number is not an integer'))
+        if number < 1:
+            raise EmptyPage(_('That page number is less than 1'))
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not rows and number > 1:
+            raise EmptyPage(_('That page contains no results'))
+        read = bottom + len(rows)
+        self.count = max(self.count, read + 1) if has_next else read
+        # num_pages считается от count; сбрасываем, если уже вычислен.
+        self.__dict__.pop('num_pages', None)
+        return self._get_page(rows, number, self)
+
+
+def estimate_count(queryset):
+    """Число строк таблицы по статистике планировщика PostgreSQL."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+            [queryset.model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < ESTIMATED_COUNT_THRESHOLD:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(CachedCountPaginator):
+    """Paginator для больших таблиц в админке.
+
+    Без фильтров на PostgreSQL число строк берётся из pg_class.reltuples
+    без обхода таблицы; в остальных случаях — кэшированный COUNT(*).
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if hasattr(queryset, 'query') and not queryset.query.where:
+            estimate = estimate_count(queryset)
+            if estimate is not None:
+                return estimate
+        return super().count
+
+
+class PageLimitPagination(PageNumberPagination):
+    """Пагинация ?page=&limit= из спецификации API."""
+
+    django_paginator_class = CachedCountPaginator
+    page_size = PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Keyset-пагинация по индексу (-pub_date, id), без OFFSET и COUNT."""
+
+    ordering = ('-pub_date', 'id')
+    page_size = PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+
+
+class RecipePagination(BasePagination):
+    """Постраничная выдача по умолчанию, курсорная — по запросу.
+
+    Курсорный режим включается параметром ?pagination=cursor, ссылки
+    next/previous в ответе уже содержат ?cursor=.
+    """
+
+    def __init__(self):
+        self.page_pagination = PageLimitPagination()
+        self.cursor_pagination = RecipeCursorPagination()
+        self.pagination = self.page_pagination
+
+    def is_cursor_mode(self, request):
+        return (
+            self.cursor_pagination.cursor_query_param in request.query_params
+            or request.query_params.get('pagination') == 'cursor'
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.pagination = (
+            self.cursor_pagination if self.is_cursor_mode(request)
+            else self.page_pagination
+        )
+        return self.pagination.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.pagination.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.page_pagination.get_paginated_response_schema(schema)
@@ -0,0 +1,190 @@
+"""Профилирование отдельных запросов по требованию.
+
+Сотрудник (is_staff) добавляет к запросу заголовок X-Profile: 1 или
+параметр ?profile=1; кроме того, доля PROFILE_SAMPLE_RATE всех запросов
+профилируется случайно. Запрос выполняется под cProfile, а обёртка
+record_query записывает SQL с длительностью и кадрами кода проекта,
+откуда пришёл запрос. В PROFILE_DIR остаются <id>.prof для pstats и
+snakeviz и <id>.json с запросами и сводкой; id приходит в заголовке
+X-Profile-Id, файлы отдаёт /api/_profiles/.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import re
+import traceback
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+from uuid import uuid4
+
+from django.conf import settings
+from django.http import FileResponse
+from rest_framework import exceptions
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from api.authentication import CachedTokenAuthentication
+from api.metrics import view_label
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_PARAM = 'profile'
+PROFILE_FILE = re.compile(r'\d{8}T\d{6}-[0-9a-f]{8}\.(prof|json)')
+STACK_DEPTH = 6
+MIDDLEWARE_MODULE = os.path.join('api', 'middleware.py')
+SUMMARY_LINES = 40
+
+profiled_queries = ContextVar('profiled_queries', default=None)
+
+
+def project_stack():
+    """Ближайшие к запросу кадры кода проекта, без сторонних пакетов
+    и цепочки middleware."""
+    root = str(settings.BASE_DIR)
+    frames = [
+        f'{os.path.relpath(frame.filename, root)}:{frame.lineno} {frame.name}'
+        for frame in traceback.extract_stack()[:-2]
+        if frame.filename.startswith(root)
+        and 'site-packages' not in frame.filename
+        and not frame.filename.endswith(MIDDLEWARE_MODULE)
+    ]
+    return frames[-STACK_DEPTH:]
+
+
+def record_query(execute, sql, params, many, context):
+    """execute_wrapper: SQL профилируемого запроса.
+
+    Параметры не сохраняются: в них бывают почта и хэши паролей.
+    """
+    queries = profiled_queries.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        queries.append({
+            'sql': sql,
+            'many': many,
+            'duration_ms': round((perf_counter() - started) * 1000, 3),
+            'stack': project_stack(),
+        })
+
+
+def profile_requested(request):
+    return (
+        request.headers.get(PROFILE_HEADER) == '1'
+        or request.GET.get(PROFILE_PARAM) == '1'
+    )
+
+
+def sampled():
+    return random.random() < settings.PROFILE_SAMPLE_RATE
+
+
+def is_staff(request):
+    """Сотрудник по сессии или по токену из кэша CachedTokenAuthentication.
+
+    Проверка идёт до вью, чтобы чужой флаг не замедлял запрос.
+    """
+    if request.user.is_staff:
+        return True
+    try:
+        credentials = CachedTokenAuthentication().authenticate(request)
+    except exceptions.AuthenticationFailed:
+        return False
+    return credentials is not None and credentials[0].is_staff
+
+
+class RequestProfile:
+    """cProfile и SQL одного запроса; active() можно входить несколько раз,
+    например на каждый кусок потокового ответа."""
+
+    def __init__(self, reason):
+        self.id = (
+            f'{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid4().hex[:8]}'
+        )
+        self.reason = reason
+        self.profiler = cProfile.Profile()
+        self.queries = []
+        self.elapsed = 0.0
+
+    @contextmanager
+    def active(self):
+        token = profiled_queries.set(self.queries)
+        started = perf_counter()
+        self.profiler.enable()
+        try:
+            yield
+        finally:
+            self.profiler.disable()
+            self.elapsed += perf_counter() - started
+            profiled_queries.reset(token)
+
+    def save(self, request, response):
+        directory = Path(settings.PROFILE_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        self.profiler.dump_stats(directory / f'{self.id}.prof')
+        summary = io.StringIO()
+        pstats.Stats(self.profiler, stream=summary).sort_stats(
+            'cumulative'
+        ).print_stats(SUMMARY_LINES)
+        user = getattr(request, 'user', None)
+        (directory / f'{self.id}.json').write_text(json.dumps(
+            {
+                'id': self.id,
+                'reason': self.reason,
+                'method': request.method,
+                'path': request.get_full_path(),
+                'view': view_label(request),
+                'status': response.status_code,
+                'user': user.pk if user is not None else None,
+                'duration_ms': round(self.elapsed * 1000, 3),
+                'query_count': len(self.queries),
+                'sql_ms': round(
+                    sum(query['duration_ms'] for query in self.queries), 3
+                ),
+                'queries': self.queries,
+                'summary': summary.getvalue(),
+            },
+            ensure_ascii=False,
+            indent=2
+        ))
+        prune(directory)
+
+
+def prune(directory):
+    """Оставляет PROFILE_KEEP последних профилей; id начинается с даты."""
+    for path in sorted(directory.glob('*.json'))[:-settings.PROFILE_KEEP]:
+        path.unlink(missing_ok=True)
+        path.with_suffix('.prof').unlink(missing_ok=True)
+
+
+class ProfileView(APIView):
+    """Список профилей или файл профиля; только для сотрудников."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, name=None):
+        directory = Path(settings.PROFILE_DIR)
+        if name is None:
+            profiles = []
+            for path in sorted(directory.glob('*.json'), reverse=True):
+                try:
+                    profile = json.loads(path.read_text())
+                except (OSError, ValueError):
+                    continue
+                profile.pop('queries')
+                profile.pop('summary')
+                profiles.append(profile)
+            return Response(profiles)
+        path = directory / name
+        if not PROFILE_FILE.fullmatch(name) or not path.exists():
+            raise exceptions.NotFound()
+        return FileResponse(path.open('rb'), as_attachment=True)
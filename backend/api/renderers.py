@@ -1,27 +1,183 @@
 import csv
-import io
+from abc import ABCMeta, abstractmethod
 
 from rest_framework import renderers
 
-RECIPE_DATA_FILE_HEADERS = ['name']
+SHOPPING_LIST_HEADERS = ['name', 'measurement_unit', 'amount']
 
+PDF_PAGE_WIDTH = 595
+PDF_PAGE_HEIGHT = 842
+PDF_MARGIN = 50
+PDF_FONT_SIZE = 12
+PDF_LINE_HEIGHT = 16
+PDF_LINES_ON_PAGE = (PDF_PAGE_HEIGHT - 2 * PDF_MARGIN) // PDF_LINE_HEIGHT
+# Базовые шрифты PDF не знают кириллицы по умолчанию: перекодируем
+# верхнюю половину WinAnsi под cp1251, подставив имена кириллических глифов.
+PDF_CYRILLIC_GLYPHS = ' '.join(
+    f'/afii{code}' for code in
+    [*range(10017, 10023), *range(10024, 10050),
+     *range(10065, 10071), *range(10072, 10098)]
+)
+PDF_FONT = (
+    '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica '
+    '/Encoding << /Type /Encoding /BaseEncoding /WinAnsiEncoding '
+    f'/Differences [168 /afii10023 184 /afii10071 192 {PDF_CYRILLIC_GLYPHS}]'
+    ' >> >>'
+)
 
-class CSVStudentDataRenderer(renderers.BaseRenderer):
 
-    media_type = "text/csv"
-    format = "csv"
+def shopping_list_line(number, item):
+    return (
+        f'{number}. {item["name"]} ({item["measurement_unit"]}) — '
+        f'{item["amount"]}'
+    )
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListRenderer(renderers.BaseRenderer, metaclass=ABCMeta):
+    """Базовый экспортёр списка покупок.
+
+    stream() отдаёт файл по частям, поэтому его можно передать
+    прямо в StreamingHttpResponse, не собирая весь файл в памяти.
+    """
+
+    charset = 'utf-8'
+
+    @abstractmethod
+    def stream(self, items):
+        """Куски файла в байтах по строкам items."""
 
     def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            # Ошибки DRF (401, 404) приходят словарём — отдаём их текстом.
+            return '\n'.join(
+                f'{key}: {value}' for key, value in data.items()
+            ).encode(self.charset)
+        return b''.join(self.stream(data))
+
+
+class TextShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, items):
+        for number, item in enumerate(items, start=1):
+            yield (shopping_list_line(number, item) + '\n').encode()
+
+
+class CSVShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
 
-        csv_buffer = io.StringIO()
-        csv_writer = csv.DictWriter(
-            csv_buffer,
-            fieldnames=RECIPE_DATA_FILE_HEADERS,
-            extrasaction="ignore"
+    def stream(self, items):
+        writer = csv.DictWriter(
+            Echo(),
+            fieldnames=SHOPPING_LIST_HEADERS,
+            extrasaction='ignore'
         )
-        csv_writer.writeheader()
+        yield writer.writeheader().encode()
+        for item in items:
+            yield writer.writerow(item).encode()
+
+
+class PDFShoppingListRenderer(ShoppingListRenderer):
+    """Минимальный PDF без сторонних библиотек.
+
+    Страницы пишутся по мере поступления строк; дерево страниц и таблица
+    ссылок, которым нужны итоговые смещения, — в самом конце файла.
+    """
+
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+
+    def stream(self, items):
+        offsets = {}
+        position = 0
+        page_ids = []
+        next_id = 4
+
+        def write_object(object_id, body):
+            nonlocal position
+            offsets[object_id] = position
+            chunk = f'{object_id} 0 obj\n'.encode() + body + b'\nendobj\n'
+            position += len(chunk)
+            return chunk
+
+        def write_page(lines):
+            nonlocal next_id
+            content_id, page_id = next_id, next_id + 1
+            next_id += 2
+            page_ids.append(page_id)
+            content = self.page_content(lines)
+            yield write_object(
+                content_id,
+                f'<< /Length {len(content)} >>\nstream\n'.encode()
+                + content + b'\nendstream'
+            )
+            yield write_object(page_id, (
+                f'<< /Type /Page /Parent 2 0 R /Contents {content_id} 0 R '
+                f'/MediaBox [0 0 {PDF_PAGE_WIDTH} {PDF_PAGE_HEIGHT}] '
+                '/Resources << /Font << /F1 3 0 R >> >> >>'
+            ).encode())
+
+        header = b'%PDF-1.4\n'
+        position += len(header)
+        yield header
+        yield write_object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+        yield write_object(3, PDF_FONT.encode())
+
+        lines = []
+        for number, item in enumerate(items, start=1):
+            lines.append(shopping_list_line(number, item))
+            if len(lines) == PDF_LINES_ON_PAGE:
+                yield from write_page(lines)
+                lines = []
+        if lines or not page_ids:
+            yield from write_page(lines)
+
+        kids = ' '.join(f'{page_id} 0 R' for page_id in page_ids)
+        yield write_object(2, (
+            f'<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>'
+        ).encode())
+
+        xref = [f'xref\n0 {next_id}\n', '0000000000 65535 f \n']
+        xref += [
+            f'{offsets[object_id]:010d} 00000 n \n'
+            for object_id in range(1, next_id)
+        ]
+        yield ''.join(xref).encode()
+        yield (
+            f'trailer\n<< /Size {next_id} /Root 1 0 R >>\n'
+            f'startxref\n{position}\n%%EOF\n'
+        ).encode()
+
+    @staticmethod
+    def page_content(lines):
+        commands = [
+            f'BT /F1 {PDF_FONT_SIZE} Tf {PDF_LINE_HEIGHT} TL '
+            f'{PDF_MARGIN} {PDF_PAGE_HEIGHT - PDF_MARGIN} Td'
+        ]
+        for line in lines:
+            text = line.encode('cp1251', errors='replace').decode('latin-1')
+            text = (
+                text.replace('\\', '\\\\')
+                .replace('(', '\\(')
+                .replace(')', '\\)')
+            )
+            commands.append(f'({text}) Tj T*')
+        commands.append('ET')
+        return '\n'.join(commands).encode('latin-1')
 
-        for recipes_data in data:
-            csv_writer.writerow(recipes_data)
 
-        return csv_buffer.getvalue()
+SHOPPING_LIST_RENDERERS = [
+    TextShoppingListRenderer,
+    CSVShoppingListRenderer,
+    PDFShoppingListRenderer,
+]
@@ -0,0 +1,187 @@
+import re
+from collections import Counter
+from functools import reduce
+from operator import add
+
+from django.db.models import F, FilteredRelation, Q
+
+from api.models import RecipeSearchTerm
+
+INDEX_BATCH_SIZE = 1000
+VOWELS = 'аеиоуыэюя'
+TERM_MAX_LENGTH = 64
+# Вес слова зависит от поля: совпадение в названии важнее, чем в тексте.
+NAME_WEIGHT = 4
+INGREDIENT_WEIGHT = 2
+TEXT_WEIGHT = 1
+WEIGHT_LIMIT = 32767
+STOP_WORDS = frozenset(
+    'и в во на с со по за из к ко от до для не но а о об у же'.split()
+)
+
+TOKEN = re.compile(r'[0-9a-zа-яё]+')
+PERFECTIVE_GERUND = re.compile(
+    r'(ив|ивши|ившись|ыв|ывши|ывшись|(?<=[ая])(в|вши|вшись))$'
+)
+REFLEXIVE = re.compile(r'(ся|сь)$')
+ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|'
+    r'ую|юю|ая|яя|ою|ею)$'
+)
+PARTICIPLE = re.compile(r'(ивш|ывш|ующ|(?<=[ая])(ем|нн|вш|ющ|щ))$')
+VERB = re.compile(
+    r'(ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|ено|'
+    r'ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю|'
+    r'(?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно))$'
+)
+NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|'
+    r'ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$'
+)
+DERIVATIONAL = re.compile(r'(ост|ость)$')
+SUPERLATIVE = re.compile(r'(ейш|ейше)$')
+
+
+def _region_start(word, start):
+    """Начало области после первой согласной, следующей за гласной."""
+    for position in range(start + 1, len(word)):
+        if word[position] not in VOWELS and word[position - 1] in VOWELS:
+            return position + 1
+    return len(word)
+
+
+def stem(word):
+    """Основа слова по алгоритму Snowball для русского языка.
+
+    Окончания ищутся только в области RV (после первой гласной), поэтому
+    латиница и числа возвращаются без изменений.
+    """
+    word = word.replace('ё', 'е')
+    rv_start = next(
+        (position + 1 for position, letter in enumerate(word)
+         if letter in VOWELS),
+        len(word)
+    )
+    r2_start = _region_start(word, _region_start(word, 0))
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    # Шаг 1: деепричастие, иначе возвратная частица и затем
+    # прилагательное/причастие, глагол или существительное.
+    match = PERFECTIVE_GERUND.search(rv)
+    if match:
+        rv = rv[:match.start()]
+    else:
+        rv = REFLEXIVE.sub('', rv, 1)
+        match = ADJECTIVE.search(rv)
+        if match:
+            rv = rv[:match.start()]
+            rv = PARTICIPLE.sub('', rv, 1)
+        else:
+            match = VERB.search(rv) or NOUN.search(rv)
+            if match:
+                rv = rv[:match.start()]
+    # Шаг 2.
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    # Шаг 3: словообразовательный суффикс только в области R2.
+    match = DERIVATIONAL.search(rv)
+    if match and rv_start + match.start() >= r2_start:
+        rv = rv[:match.start()]
+    # Шаг 4.
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    else:
+        match = SUPERLATIVE.search(rv)
+        if match:
+            rv = rv[:match.start()]
+            if rv.endswith('нн'):
+                rv = rv[:-1]
+        elif rv.endswith('ь'):
+            rv = rv[:-1]
+    return prefix + rv
+
+
+def terms(text):
+    """Основы значимых слов текста в порядке появления."""
+    return [
+        stem(token)[:TERM_MAX_LENGTH]
+        for token in TOKEN.findall(text.lower())
+        if len(token) > 1 and token not in STOP_WORDS
+    ]
+
+
+def document_terms(name, text, ingredient_names):
+    """Словарь {основа: вес} для индекса одного рецепта."""
+    weights = Counter()
+    for term in terms(name):
+        weights[term] += NAME_WEIGHT
+    for ingredient_name in ingredient_names:
+        for term in terms(ingredient_name):
+            weights[term] += INGREDIENT_WEIGHT
+    for term in terms(text):
+        weights[term] += TEXT_WEIGHT
+    return {
+        term: min(weight, WEIGHT_LIMIT) for term, weight in weights.items()
+    }
+
+
+def index_recipe(recipe):
+    """Перестраивает строки RecipeSearchTerm одного рецепта."""
+    weights = document_terms(
+        recipe.name,
+        recipe.text,
+        recipe.ingredients.values_list('name', flat=True)
+    )
+    RecipeSearchTerm.objects.filter(recipe=recipe).delete()
+    RecipeSearchTerm.objects.bulk_create(
+        RecipeSearchTerm(recipe=recipe, term=term, weight=weight)
+        for term, weight in weights.items()
+    )
+
+
+def index_recipes(recipes):
+    for recipe in recipes.iterator():
+        index_recipe(recipe)
+
+
+def build_search_index(recipes):
+    """Заполняет индекс для переданных рецептов пачками."""
+    RecipeSearchTerm.objects.bulk_create(
+        (
+            RecipeSearchTerm(recipe_id=recipe.pk, term=term, weight=weight)
+            for recipe in recipes.prefetch_related('ingredients').iterator(
+                chunk_size=INDEX_BATCH_SIZE
+            )
+            for term, weight in document_terms(
+                recipe.name,
+                recipe.text,
+                [ingredient.name for ingredient in recipe.ingredients.all()]
+            ).items()
+        ),
+        batch_size=INDEX_BATCH_SIZE
+    )
+
+
+def search_recipes(queryset, query):
+    """Рецепты, содержащие все слова запроса, с рангом search_rank.
+
+    На каждую основу запроса — отдельный INNER JOIN к индексу по ключу
+    (term, recipe), ранг — сумма весов совпавших основ. Группировка
+    не нужна: пара (term, recipe) в индексе уникальна. Сортировка по рангу,
+    затем по дате публикации.
+    """
+    query_terms = sorted(set(terms(query)))
+    if not query_terms:
+        return queryset.none()
+    weights = []
+    for number, term in enumerate(query_terms):
+        alias = f'search_term_{number}'
+        queryset = queryset.annotate(**{
+            alias: FilteredRelation(
+                'search_terms', condition=Q(search_terms__term=term)
+            )
+        }).filter(**{f'{alias}__isnull': False})
+        weights.append(F(f'{alias}__weight'))
+    return queryset.annotate(
+        search_rank=reduce(add, weights)
+    ).order_by('-search_rank', '-pub_date', 'id')
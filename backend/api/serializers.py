@@ -1,20 +1,86 @@
-import base64
-
 from django.contrib.auth.validators import UnicodeUsernameValidator
-from django.core.files.base import ContentFile
+from django.db import transaction
 from rest_framework import serializers
-from api.models import Ingredient, Tag, Recipe, User
+
+from api.images import decode_base64_image, rendition_urls
+from api.models import Ingredient, Recipe, RecipeIngredient, Tag, User
 
 
 class Base64ImageField(serializers.ImageField):
+    """Изображение из data URL, декодированное во временный файл.
+
+    Файлы поля закрывает DecodedFilesMixin сериализатора: после save()
+    или неудачной проверки данных.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.decoded_files = []
+
     def to_internal_value(self, data):
-        if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            # Затем декодировать сами данные и поместить результат в файл,
-            # которому дать название по шаблону.
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
-        return super().to_internal_value(data)
+        if not (isinstance(data, str) and data.startswith('data:image')):
+            return super().to_internal_value(data)
+        # Декодируем по частям во временный файл, не копируя
+        # всю строку base64 и не держа результат в памяти.
+        file = decode_base64_image(data)
+        try:
+            value = super().to_internal_value(file)
+        except Exception:
+            # Битое изображение: ImageField бросает ValidationError
+            # Django, а не DRF.
+            file.close()
+            raise
+        self.decoded_files.append(file)
+        return value
+
+    def close_decoded_files(self):
+        # Если хранилище уже переместило файл, close() это учитывает.
+        for file in self.decoded_files:
+            file.close()
+        self.decoded_files.clear()
+
+
+class DecodedFilesMixin:
+    """Закрывает временные файлы полей Base64ImageField.
+
+    Без этого файл остаётся открытым до сборщика мусора, и тот пишет
+    «Exception ignored ... FileNotFoundError» про уже перемещённый файл.
+    """
+
+    def is_valid(self, *, raise_exception=False):
+        try:
+            valid = super().is_valid(raise_exception=raise_exception)
+        except serializers.ValidationError:
+            self.close_decoded_files()
+            raise
+        if not valid:
+            self.close_decoded_files()
+        return valid
+
+    def save(self, **kwargs):
+        try:
+            return super().save(**kwargs)
+        finally:
+            self.close_decoded_files()
+
+    def close_decoded_files(self):
+        for field in self.fields.values():
+            if isinstance(field, Base64ImageField):
+                field.close_decoded_files()
+
+
+class ImageRenditionsField(serializers.ReadOnlyField):
+    """Ссылки на уменьшенные варианты изображения (thumbnail, card, full)."""
+
+    def to_representation(self, value):
+        urls = rendition_urls(value)
+        request = self.context.get('request')
+        if urls is None or request is None:
+            return urls
+        return {
+            rendition: request.build_absolute_uri(url)
+            for rendition, url in urls.items()
+        }
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -24,7 +90,7 @@ class TagSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(DecodedFilesMixin, serializers.ModelSerializer):
     username = serializers.CharField(
         max_length=128,
         validators=[UnicodeUsernameValidator()]
@@ -38,6 +104,7 @@ class UserSerializer(serializers.ModelSerializer):
         required=False,
         allow_null=True
     )
+    avatar_renditions = ImageRenditionsField(source='avatar')
     is_in_shopping_cart = serializers.BooleanField(
         default=False
     )
@@ -46,23 +113,90 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ('email', 'id', 'username',
                   'first_name', 'last_name', 'is_subscribed',
-                  'is_in_shopping_cart', 'avatar'
+                  'is_in_shopping_cart', 'avatar', 'avatar_renditions'
                   )
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeIngredientSerializer(serializers.ModelSerializer):
+    id = serializers.PrimaryKeyRelatedField(
+        source='ingredient',
+        queryset=Ingredient.objects.all()
+    )
+    name = serializers.CharField(
+        source='ingredient.name',
+        read_only=True
+    )
+    measurement_unit = serializers.CharField(
+        source='ingredient.measurement_unit',
+        read_only=True
+    )
+
+    class Meta:
+        model = RecipeIngredient
+        fields = ('id', 'name', 'measurement_unit', 'amount')
+
+
+class RecipeSerializer(DecodedFilesMixin, serializers.ModelSerializer):
     tags = TagSerializer(read_only=True)
+    ingredients = RecipeIngredientSerializer(
+        many=True,
+        source='recipe_ingredients'
+    )
+    image = Base64ImageField()
+    image_renditions = ImageRenditionsField(source='image')
     author = UserSerializer(
         read_only=True,
     )
-    count = serializers.IntegerField(
-        default=0
+    is_favorited = serializers.BooleanField(
+        read_only=True,
+        default=False
+    )
+    is_in_shopping_cart = serializers.BooleanField(
+        read_only=True,
+        default=False
     )
 
     class Meta:
         model = Recipe
         fields = '__all__'
 
+    def to_representation(self, instance):
+        # Подписка на автора аннотирована на рецепте (author_is_subscribed),
+        # переносим её в автора, чтобы UserSerializer не ходил в базу.
+        if hasattr(instance, 'author_is_subscribed'):
+            instance.author.is_subscribed = instance.author_is_subscribed
+        return super().to_representation(instance)
+
+    def validate_ingredients(self, value):
+        ingredients = [item['ingredient'] for item in value]
+        if not ingredients:
+            raise serializers.ValidationError('Нужен хотя бы один ингредиент.')
+        if len(set(ingredients)) != len(ingredients):
+            raise serializers.ValidationError('Ингредиенты повторяются.')
+        return value
+
+    @staticmethod
+    def set_ingredients(recipe, ingredients):
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, **item) for item in ingredients
+        )
+
+    @transaction.atomic
+    def create(self, validated_data):
+        ingredients = validated_data.pop('recipe_ingredients')
+        recipe = super().create(validated_data)
+        self.set_ingredients(recipe, ingredients)
+        return recipe
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        ingredients = validated_data.pop('recipe_ingredients', None)
+        instance = super().update(instance, validated_data)
+        if ingredients is not None:
+            instance.recipe_ingredients.all().delete()
+            self.set_ingredients(instance, ingredients)
+        return instance
+
 
 class IngredientSerializer(serializers.ModelSerializer):
 
@@ -71,9 +205,26 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class SubscriptionsSerializer(serializers.ModelSerializer):
-    results = UserSerializer()
+class ShortRecipeSerializer(serializers.ModelSerializer):
 
     class Meta:
-        model = User
-        fields = '__all__'
+        model = Recipe
+        fields = ('id', 'name', 'image', 'cooking_time')
+
+
+class SubscriptionsSerializer(UserSerializer):
+    """Автор из ленты подписок.
+
+    Ожидает рецепты, заранее загруженные в атрибут feed_recipes;
+    recipes_count — счётчик в самой модели User.
+    """
+
+    recipes = ShortRecipeSerializer(
+        source='feed_recipes',
+        many=True,
+        read_only=True
+    )
+    recipes_count = serializers.IntegerField(read_only=True)
+
+    class Meta(UserSerializer.Meta):
+        fields = UserSerializer.Meta.fields + ('recipes', 'recipes_count')
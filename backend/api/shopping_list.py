@@ -0,0 +1,21 @@
+from django.db.models import F, Sum
+
+from api.models import RecipeIngredient
+
+
+def get_shopping_list(user):
+    """Ингредиенты из корзины пользователя с суммой количеств.
+
+    Один агрегирующий запрос: SUM(amount) с группировкой по названию
+    и единице измерения.
+    """
+    return (
+        RecipeIngredient.objects
+        .filter(recipe__shopping_cart__user=user)
+        .values(
+            name=F('ingredient__name'),
+            measurement_unit=F('ingredient__measurement_unit')
+        )
+        .annotate(amount=Sum('amount'))
+        .order_by('name', 'measurement_unit')
+    )
@@ -0,0 +1,72 @@
+import re
+import secrets
+import string
+from threading import Lock
+
+from django.db import IntegrityError, connection, transaction
+
+from api.models import ShortLink
+
+BASE62 = string.digits + string.ascii_letters
+# 62**6 ≈ 5.7e10 кодов: совпадения редки, а ссылка остаётся короткой.
+CODE_LENGTH = 6
+SHORT_LINK_PATH = re.compile(r'/s/(?P<code>[0-9A-Za-z]{1,16})/?')
+
+
+def generate_code():
+    return ''.join(secrets.choice(BASE62) for _ in range(CODE_LENGTH))
+
+
+class ShortLinkCache:
+    """Словарь code -> id рецепта в памяти процесса.
+
+    Коды не меняются, поэтому записи не устаревают; промах дочитывает
+    один код сырым запросом по уникальному индексу, без ORM.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._recipes = {}
+
+    def get(self, code):
+        return self._recipes.get(code)
+
+    def add(self, code, recipe_id):
+        with self._lock:
+            self._recipes[code] = recipe_id
+
+    def discard(self, code):
+        with self._lock:
+            self._recipes.pop(code, None)
+
+    def load(self, code):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT recipe_id FROM {ShortLink._meta.db_table} '
+                'WHERE code = %s',
+                [code]
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        self.add(code, row[0])
+        return row[0]
+
+
+short_links = ShortLinkCache()
+
+
+def get_short_code(recipe):
+    """Код короткой ссылки рецепта; создаётся при первом запросе."""
+    link = ShortLink.objects.filter(recipe=recipe).first()
+    while link is None:
+        try:
+            with transaction.atomic():
+                link = ShortLink.objects.create(
+                    recipe=recipe, code=generate_code()
+                )
+        except IntegrityError:
+            # Совпал код или ссылку одновременно создал другой запрос.
+            link = ShortLink.objects.filter(recipe=recipe).first()
+    short_links.add(link.code, recipe.pk)
+    return link.code
@@ -0,0 +1,164 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_cache
+from api.cache import invalidate_reference_cache
+from api.counters import change_counter
+from api.images import delete_renditions, schedule_image_processing
+from api.ingredient_index import ingredient_index
+from api.metrics import count_query
+from api.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    ShoppingCartItem,
+    ShortLink,
+    Subscribe,
+    Tag,
+    User
+)
+from api.profiling import record_query
+from api.search import index_recipe, index_recipes
+from api.short_links import short_links
+from api.timeline import fan_out, followers_changed, invalidate_timeline
+
+IMAGE_FIELDS = {
+    Recipe: 'image',
+    User: 'avatar',
+}
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def invalidate_ingredient_index(**kwargs):
+    ingredient_index.invalidate()
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+@receiver([post_save, post_delete], sender=Tag)
+def invalidate_reference_responses(sender, **kwargs):
+    invalidate_reference_cache(sender)
+
+
+@receiver(pre_save, sender=Recipe)
+@receiver(pre_save, sender=User)
+def mark_new_image(sender, instance, **kwargs):
+    # Новый, ещё не сохранённый в хранилище файл: сам файл запишется
+    # при сохранении модели, после этого его можно обрабатывать.
+    field = IMAGE_FIELDS[sender]
+    file = getattr(instance, field)
+    instance._has_new_image = bool(file) and not file._committed
+    # Имя прежнего файла берём из базы: у экземпляра оно уже заменено.
+    instance._old_image_name = (
+        sender.objects.filter(pk=instance.pk).values_list(
+            field, flat=True
+        ).first()
+        if instance._has_new_image and instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=User)
+def process_new_image(sender, instance, **kwargs):
+    if getattr(instance, '_has_new_image', False):
+        file = getattr(instance, IMAGE_FIELDS[sender])
+        old_name = instance._old_image_name
+        if old_name and old_name != file.name:
+            transaction.on_commit(
+                lambda: delete_renditions(file.storage, old_name)
+            )
+        transaction.on_commit(lambda: schedule_image_processing(file))
+
+
+@receiver(post_save, sender=Recipe)
+def add_recipe_to_timelines(instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: fan_out(instance))
+
+
+@receiver(post_save, sender=Recipe)
+def update_search_index(instance, **kwargs):
+    # Состав рецепта записывается после самого рецепта в той же
+    # транзакции, поэтому индекс строится после коммита.
+    transaction.on_commit(lambda: index_recipe(instance))
+
+
+@receiver(post_save, sender=Ingredient)
+def update_ingredient_search_index(instance, created, **kwargs):
+    if not created:
+        transaction.on_commit(lambda: index_recipes(
+            Recipe.objects.filter(ingredients=instance)
+        ))
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCartItem)
+@receiver(post_save, sender=Recipe)
+def increment_counter(instance, created, **kwargs):
+    if created:
+        change_counter(instance, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCartItem)
+@receiver(post_delete, sender=Recipe)
+def decrement_counter(instance, **kwargs):
+    change_counter(instance, -1)
+
+
+@receiver(post_delete, sender=ShortLink)
+def forget_short_link(instance, **kwargs):
+    short_links.discard(instance.code)
+
+
+@receiver([post_save, post_delete], sender=Subscribe)
+def rebuild_timeline(instance, **kwargs):
+    invalidate_timeline(instance.user_id)
+
+
+@receiver(post_save, sender=Subscribe)
+def count_new_follower(instance, created, **kwargs):
+    if created:
+        followers_changed(instance.subscription_id, added=True)
+
+
+@receiver(post_delete, sender=Subscribe)
+def count_lost_follower(instance, **kwargs):
+    followers_changed(instance.subscription_id, added=False)
+
+
+@receiver(post_delete, sender=Token)
+def forget_token(instance, **kwargs):
+    token_cache.delete(instance.key)
+
+
+@receiver(post_save, sender=User)
+def forget_user_tokens(instance, **kwargs):
+    # Пароль, активность или профиль изменились: следующий запрос
+    # с токеном этого пользователя загрузит его из базы заново.
+    token_cache.delete_user(instance.pk)
+
+
+@receiver(connection_created)
+def configure_sqlite(connection, **kwargs):
+    # WAL пишет в журнал рядом с базой: читатели не ждут писателя,
+    # а synchronous=NORMAL в этом режиме не теряет согласованность.
+    if settings.SQLITE_WAL and connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+
+
+@receiver(connection_created)
+def instrument_queries(connection, **kwargs):
+    # В начало списка: execute_wrapper() снимает последнюю обёртку,
+    # и соединение, открытое внутри такого блока, не должно её сместить.
+    for enabled, wrapper in (
+        (settings.METRICS_ENABLED, count_query),
+        (settings.PROFILING_ENABLED, record_query),
+    ):
+        if enabled and wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.insert(0, wrapper)
@@ -0,0 +1,77 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.ingredient_index import ingredient_index
+from api.models import Ingredient, Recipe, RecipeIngredient, Tag, User
+
+
+@pytest.fixture(autouse=True)
+def clean_caches():
+    # Кэши переживают откат транзакции теста.
+    cache.clear()
+    ingredient_index.invalidate()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create(username='cook', email='cook@example.com')
+
+
+@pytest.fixture
+def author(db):
+    return User.objects.create(username='author', email='author@example.com')
+
+
+@pytest.fixture
+def tag(db):
+    return Tag.objects.create(tag='Завтрак', slug='breakfast')
+
+
+@pytest.fixture
+def ingredients(db):
+    return Ingredient.objects.bulk_create(
+        Ingredient(name=name, measurement_unit='г')
+        for name in ('мука', 'сахар', 'соль')
+    )
+
+
+@pytest.fixture
+def make_recipe(author, tag, ingredients):
+    numbers = iter(range(1, 1000))
+
+    def make(recipe_author=None, amounts=(100, 50)):
+        number = next(numbers)
+        recipe = Recipe.objects.create(
+            name=f'Рецепт {number}',
+            author=recipe_author or author,
+            tags=tag,
+            image='img/test.png',
+            text='Описание',
+            cooking_time=10,
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe, ingredient=ingredient, amount=amount
+            )
+            for ingredient, amount in zip(ingredients, amounts)
+        )
+        return recipe
+    return make
+
+
+@pytest.fixture
+def anonymous_client():
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}'
+    )
+    return client
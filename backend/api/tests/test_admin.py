@@ -0,0 +1,31 @@
+import pytest
+from django.test import Client
+
+from api.models import User
+
+
+@pytest.fixture
+def admin_client(db):
+    admin = User.objects.create_superuser(
+        username='admin', email='admin@example.com', password='admin-Pa55'
+    )
+    client = Client()
+    client.force_login(admin)
+    return client
+
+
+@pytest.mark.parametrize('term', ['auth', 'Auth', 'author@ex'])
+def test_recipe_author_autocomplete_finds_by_prefix(
+    admin_client, author, term
+):
+    response = admin_client.get('/admin/autocomplete/', {
+        'app_label': 'api',
+        'model_name': 'recipe',
+        'field_name': 'author',
+        'term': term,
+    })
+
+    assert response.status_code == 200
+    assert [row['id'] for row in response.json()['results']] == [
+        str(author.pk)
+    ]
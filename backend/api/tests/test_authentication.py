@@ -0,0 +1,29 @@
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_cache
+
+
+def test_token_is_cached_in_shared_cache(user, user_client):
+    key = Token.objects.get(user=user).key
+
+    assert user_client.get('/api/users/me/').status_code == 200
+
+    assert cache.get(token_cache.cache_key(key))[0].pk == user.pk
+
+
+def test_logout_revokes_cached_token(user_client):
+    assert user_client.get('/api/users/me/').status_code == 200
+
+    assert user_client.post('/api/auth/token/logout/').status_code == 204
+
+    assert user_client.get('/api/users/me/').status_code == 401
+
+
+def test_deactivated_user_is_not_authenticated_from_cache(user, user_client):
+    assert user_client.get('/api/users/me/').status_code == 200
+
+    user.is_active = False
+    user.save()
+
+    assert user_client.get('/api/users/me/').status_code == 401
@@ -0,0 +1,20 @@
+import pytest
+
+from api.benchmarks import measure, p95
+
+
+@pytest.mark.parametrize('timings, expected', [
+    ([5], 5),
+    ([2, 1], 2),
+    (list(range(20, 0, -1)), 19),
+    (list(range(1, 101)), 95),
+    (list(range(1, 102)), 96),
+])
+def test_p95_uses_nearest_rank(timings, expected):
+    assert p95(timings) == expected
+
+
+def test_p95_is_not_below_median():
+    median_ms, p95_ms = measure(lambda: None, 2)
+
+    assert p95_ms >= median_ms
@@ -0,0 +1,26 @@
+from django.test import override_settings
+
+from api.checks import check_shared_cache
+
+LOCMEM = {'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+}}
+SHARED = {'default': {
+    'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+    'LOCATION': 'redis://127.0.0.1:6379',
+}}
+
+
+@override_settings(WEB_CONCURRENCY=4, CACHES=LOCMEM)
+def test_process_local_cache_with_several_workers_is_an_error():
+    assert [error.id for error in check_shared_cache(None)] == ['api.E001']
+
+
+@override_settings(WEB_CONCURRENCY=1, CACHES=LOCMEM)
+def test_process_local_cache_with_one_worker_is_allowed():
+    assert check_shared_cache(None) == []
+
+
+@override_settings(WEB_CONCURRENCY=4, CACHES=SHARED)
+def test_shared_cache_with_several_workers_is_allowed():
+    assert check_shared_cache(None) == []
@@ -0,0 +1,50 @@
+from api.counters import recount
+from api.models import Favorite, Recipe, ShoppingCartItem, User
+
+
+def counters(recipe):
+    recipe = Recipe.objects.get(pk=recipe.pk)
+    return (
+        recipe.favorites_count,
+        recipe.shopping_cart_count,
+        User.objects.get(pk=recipe.author_id).recipes_count,
+    )
+
+
+def test_signals_keep_counters_in_step(user, author, make_recipe):
+    recipe = make_recipe()
+    make_recipe()
+    favorite = Favorite.objects.create(user=user, recipe=recipe)
+    Favorite.objects.create(user=author, recipe=recipe)
+    ShoppingCartItem.objects.create(user=user, recipe=recipe)
+    assert counters(recipe) == (2, 1, 2)
+
+    favorite.delete()
+    ShoppingCartItem.objects.filter(user=user).delete()
+    assert counters(recipe) == (1, 0, 2)
+
+    Recipe.objects.exclude(pk=recipe.pk).delete()
+    assert counters(recipe) == (1, 0, 1)
+
+
+def test_recount_matches_signals(user, author, make_recipe):
+    recipe = make_recipe()
+    Favorite.objects.create(user=user, recipe=recipe)
+    ShoppingCartItem.objects.create(user=author, recipe=recipe)
+    expected = counters(recipe)
+    Recipe.objects.update(favorites_count=0, shopping_cart_count=0)
+    User.objects.update(recipes_count=0)
+
+    recount()
+
+    assert counters(recipe) == expected == (1, 1, 1)
+
+
+def test_deleting_favorited_recipe(author, make_recipe):
+    recipe = make_recipe()
+    Favorite.objects.create(user=author, recipe=recipe)
+
+    # Каскад удаляет избранное после рецепта: его счётчик уже не нужен.
+    recipe.delete()
+
+    assert User.objects.get(pk=author.pk).recipes_count == 0
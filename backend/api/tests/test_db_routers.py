@@ -0,0 +1,49 @@
+import pytest
+
+from api.db_routers import REPLICA_DATABASE, reading_from_replica
+from api.models import Recipe, Tag
+
+# Подменять DATABASES Django считает рискованным; роутер только выбирает
+# алиас, соединение с репликой в тестах не открывается.
+pytestmark = pytest.mark.filterwarnings(
+    'ignore:Overriding setting DATABASES'
+)
+
+
+@pytest.fixture
+def replica(settings):
+    settings.DATABASES = {
+        **settings.DATABASES,
+        REPLICA_DATABASE: {
+            **settings.DATABASES['default'], 'TEST': {'MIRROR': 'default'}
+        },
+    }
+    settings.DATABASE_ROUTERS = ['api.db_routers.ReadReplicaRouter']
+    token = reading_from_replica.set(True)
+    yield
+    reading_from_replica.reset(token)
+
+
+def test_reads_go_to_replica(replica):
+    assert Recipe.objects.all().db == REPLICA_DATABASE
+
+
+def test_reads_outside_replica_actions_go_to_default(settings):
+    settings.DATABASE_ROUTERS = ['api.db_routers.ReadReplicaRouter']
+
+    assert Recipe.objects.all().db == 'default'
+
+
+@pytest.mark.django_db
+def test_writes_go_to_default(replica):
+    tag = Tag.objects.create(tag='Обед', slug='lunch')
+
+    assert tag._state.db == 'default'
+
+
+@pytest.mark.django_db
+def test_reads_after_write_stick_to_default(replica):
+    Tag.objects.create(tag='Обед', slug='lunch')
+
+    assert Tag.objects.all().db == 'default'
+    assert Recipe.objects.all().db == 'default'
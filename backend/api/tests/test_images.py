@@ -0,0 +1,134 @@
+import base64
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+from django.core.files.base import ContentFile
+from PIL import Image
+
+from api import serializers, signals
+from api.images import (
+    decode_base64_image,
+    process_image,
+    rendition_name,
+    rendition_urls,
+    save_atomically
+)
+
+
+@pytest.fixture
+def decoded_files(monkeypatch, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    files = []
+
+    def decode(data):
+        files.append(decode_base64_image(data))
+        return files[-1]
+
+    monkeypatch.setattr(serializers, 'decode_base64_image', decode)
+    return files
+
+
+def png_bytes():
+    buffer = BytesIO()
+    Image.new('RGB', (8, 8), 'orange').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def png_data_url():
+    return 'data:image/png;base64,' + base64.b64encode(png_bytes()).decode()
+
+
+def test_temporary_file_is_closed_after_avatar_upload(
+    user_client, decoded_files
+):
+    response = user_client.put(
+        '/api/users/me/avatar/', {'avatar': png_data_url()}, format='json'
+    )
+
+    assert response.status_code == 200
+    assert [file.closed for file in decoded_files] == [True]
+
+
+def test_temporary_file_is_closed_when_image_is_invalid(
+    user_client, decoded_files
+):
+    broken = 'data:image/png;base64,' + base64.b64encode(
+        b'\x89PNG\r\n\x1a\n' + b'0' * 64
+    ).decode()
+
+    response = user_client.put(
+        '/api/users/me/avatar/', {'avatar': broken}, format='json'
+    )
+
+    assert 'avatar' in response.json()
+    assert [file.closed for file in decoded_files] == [True]
+
+
+def test_process_image_replaces_files_whole(settings, tmp_path):
+    settings.IMAGE_MAX_DIMENSION = 100
+    path = tmp_path / 'cake.png'
+    Image.new('RGB', (400, 200), 'orange').save(path)
+
+    process_image(str(path))
+
+    with Image.open(path) as image:
+        assert image.size == (100, 50)
+    for rendition in settings.IMAGE_RENDITIONS:
+        assert Path(rendition_name(str(path), rendition)).exists()
+    assert list(tmp_path.glob('*.tmp')) == []
+
+
+def test_failed_save_keeps_original(tmp_path, monkeypatch):
+    path = tmp_path / 'cake.png'
+    Image.new('RGB', (8, 8), 'orange').save(path)
+    original = path.read_bytes()
+
+    def fail(self, file, **params):
+        file.write(b'half')
+        raise OSError('disk full')
+
+    monkeypatch.setattr(Image.Image, 'save', fail)
+    with pytest.raises(OSError):
+        save_atomically(Image.new('RGB', (8, 8)), str(path), format='PNG')
+
+    assert path.read_bytes() == original
+    assert list(tmp_path.glob('*.tmp')) == []
+
+
+def test_missing_renditions_fall_back_to_original(user, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    user.avatar.save('cake.png', ContentFile(png_bytes()), save=False)
+    thumbnail = rendition_name(user.avatar.name, 'thumbnail')
+    user.avatar.storage.save(thumbnail, ContentFile(b'webp'))
+
+    urls = rendition_urls(user.avatar)
+
+    assert urls['thumbnail'] == user.avatar.storage.url(thumbnail)
+    assert urls['card'] == urls['full'] == user.avatar.url
+
+
+@pytest.mark.django_db
+def test_old_renditions_are_deleted_when_image_changes(
+    user, settings, tmp_path, monkeypatch, django_capture_on_commit_callbacks
+):
+    settings.MEDIA_ROOT = tmp_path
+    monkeypatch.setattr(
+        signals, 'schedule_image_processing', lambda file: None
+    )
+    user.avatar.save('old.png', ContentFile(png_bytes()))
+    old = [
+        Path(user.avatar.path).with_name(
+            Path(rendition_name(user.avatar.name, rendition)).name
+        )
+        for rendition in settings.IMAGE_RENDITIONS
+    ]
+    for path in old:
+        path.write_bytes(b'webp')
+
+    # Как в сериализаторе: новый файл присваивается полю до save().
+    user.avatar = ContentFile(png_bytes(), name='new.png')
+    with django_capture_on_commit_callbacks(execute=True):
+        user.save()
+
+    assert not any(path.exists() for path in old)
@@ -0,0 +1,64 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.test import override_settings
+
+from api.cache import invalidate_reference_cache
+from api.ingredient_index import ingredient_index
+from api.models import Ingredient
+
+
+@pytest.fixture
+def names(db):
+    Ingredient.objects.bulk_create(
+        Ingredient(name=name, measurement_unit='г')
+        for name in ('сахарная пудра', 'Сахар', 'тростниковый сахар', 'соль')
+    )
+
+
+def found(query):
+    return [row['name'] for row in ingredient_index.search(query)]
+
+
+def test_prefix_matches_come_before_substring_matches(names):
+    assert found('сах') == ['Сахар', 'сахарная пудра', 'тростниковый сахар']
+
+
+def test_empty_query_returns_everything_sorted(names):
+    assert found(' ') == [
+        'Сахар', 'сахарная пудра', 'соль', 'тростниковый сахар'
+    ]
+
+
+def test_api_returns_index_order(names, anonymous_client):
+    response = anonymous_client.get('/api/ingredients/', {'name': 'САХ'})
+
+    assert response.status_code == 200
+    assert [row['name'] for row in response.json()] == [
+        'Сахар', 'сахарная пудра', 'тростниковый сахар'
+    ]
+
+
+@override_settings(INGREDIENT_INDEX_CHECK_INTERVAL=0)
+def test_index_sees_rows_loaded_without_signals(names, tmp_path):
+    assert found('мёд') == []
+    path = tmp_path / 'ingredients.csv'
+    path.write_text('мёд,г\n', encoding='utf-8')
+
+    # Команда пишет через bulk_create: сигналы этого процесса не срабатывают,
+    # индекс узнаёт об изменении по поколению в общем кэше.
+    call_command('load_ingredients', str(path), stdout=StringIO())
+
+    assert found('мёд') == ['мёд']
+
+
+@override_settings(INGREDIENT_INDEX_CHECK_INTERVAL=60)
+def test_generation_is_checked_not_more_often_than_interval(names):
+    found('сах')
+    Ingredient.objects.bulk_create(
+        [Ingredient(name='сахарин', measurement_unit='г')]
+    )
+    invalidate_reference_cache(Ingredient)
+
+    assert 'сахарин' not in found('сах')
@@ -0,0 +1,41 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from api.metrics import MetricsRegistry, RequestStats
+
+
+def observe(registry):
+    registry.observe(
+        'RecipeViewSet.list', 'GET', 200, 0.01, RequestStats(), 10
+    )
+
+
+def test_concurrent_flushes_do_not_fail(settings, tmp_path):
+    settings.METRICS_DIR = tmp_path
+    settings.METRICS_FLUSH_INTERVAL = 0
+    registry = MetricsRegistry()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for future in [
+            executor.submit(observe, registry) for _ in range(200)
+        ]:
+            future.result()
+    registry.flush()
+
+    [path] = tmp_path.glob('*.json')
+    assert json.loads(path.read_text())['requests'] == [
+        ['RecipeViewSet.list', 'GET', '200', 200]
+    ]
+    assert list(tmp_path.glob('*.tmp')) == []
+
+
+def test_flush_error_does_not_escape(settings, tmp_path, caplog):
+    directory = tmp_path / 'metrics'
+    directory.write_text('не каталог')
+    settings.METRICS_DIR = directory
+    settings.METRICS_FLUSH_INTERVAL = 0
+    registry = MetricsRegistry()
+
+    observe(registry)
+
+    assert 'Не удалось записать метрики' in caplog.text
@@ -0,0 +1,54 @@
+from api.models import ShoppingCartItem, Subscribe, User
+
+
+def test_recipe_list_shows_rows_added_after_count_was_cached(
+    user_client, make_recipe
+):
+    make_recipe()
+    make_recipe()
+    assert user_client.get('/api/recipes/').json()['count'] == 2
+    make_recipe()
+    response = user_client.get('/api/recipes/')
+    assert response.json()['count'] == 3
+    assert len(response.json()['results']) == 3
+
+
+def test_next_page_is_found_past_cached_count(user_client, make_recipe):
+    for _ in range(3):
+        make_recipe()
+    assert user_client.get('/api/recipes/?limit=2').json()['count'] == 3
+    for _ in range(3):
+        make_recipe()
+    first = user_client.get('/api/recipes/?limit=2')
+    assert first.json()['next'] is not None
+    third = user_client.get('/api/recipes/?limit=2&page=3')
+    assert third.status_code == 200
+    assert len(third.json()['results']) == 2
+    assert third.json()['count'] == 6
+    assert third.json()['next'] is None
+
+
+def test_subscriptions_show_new_author(user, user_client, author):
+    Subscribe.objects.create(user=user, subscription=author)
+    assert user_client.get('/api/users/subscriptions/').json()['count'] == 1
+    other = User.objects.create(username='other', email='other@example.com')
+    Subscribe.objects.create(user=user, subscription=other)
+    response = user_client.get('/api/users/subscriptions/')
+    assert response.json()['count'] == 2
+    assert len(response.json()['results']) == 2
+
+
+def test_cart_filter_shows_new_item(user, user_client, make_recipe):
+    first, second = make_recipe(), make_recipe()
+    ShoppingCartItem.objects.create(user=user, recipe=first)
+    url = '/api/recipes/?is_in_shopping_cart=1'
+    assert len(user_client.get(url).json()['results']) == 1
+    ShoppingCartItem.objects.create(user=user, recipe=second)
+    response = user_client.get(url)
+    assert response.json()['count'] == 2
+    assert len(response.json()['results']) == 2
+
+
+def test_page_past_the_end_is_not_found(user_client, make_recipe):
+    make_recipe()
+    assert user_client.get('/api/recipes/?page=2').status_code == 404
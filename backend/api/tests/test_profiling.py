@@ -0,0 +1,103 @@
+import asyncio
+import pstats
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory
+
+from api import middleware
+from api.middleware import ProfilingMiddleware
+
+
+def first_request_work():
+    return sum(range(1000))
+
+
+def second_request_work():
+    return sum(range(1000))
+
+
+async def get_response(request):
+    work = (
+        first_request_work if request.path == '/first/'
+        else second_request_work
+    )
+    for _ in range(5):
+        work()
+        await asyncio.sleep(0)
+    return HttpResponse()
+
+
+def body_work():
+    return sum(range(1000))
+
+
+async def get_streaming_response(request):
+    view_loop = asyncio.get_running_loop()
+
+    async def body():
+        for _ in range(3):
+            assert asyncio.get_running_loop() is view_loop
+            body_work()
+            await asyncio.sleep(0)
+            yield b'chunk'
+
+    return StreamingHttpResponse(body())
+
+
+def profiled_functions(directory, response):
+    stats = pstats.Stats(
+        str(directory / f'{response["X-Profile-Id"]}.prof')
+    ).stats
+    return {name for _, _, name in stats}
+
+
+def test_async_profile_contains_only_its_own_request(
+    settings, tmp_path, monkeypatch
+):
+    settings.PROFILING_ENABLED = True
+    settings.PROFILE_SAMPLE_RATE = 0
+    settings.PROFILE_DIR = tmp_path
+    monkeypatch.setattr(middleware, 'is_staff', lambda request: True)
+    profiling = ProfilingMiddleware(get_response)
+    factory = RequestFactory()
+
+    async def serve():
+        return await asyncio.gather(
+            profiling(factory.get('/first/', HTTP_X_PROFILE='1')),
+            profiling(factory.get('/second/', HTTP_X_PROFILE='1')),
+            profiling(factory.get('/third/')),
+        )
+
+    first, second, third = asyncio.run(serve())
+
+    assert 'X-Profile-Id' not in third
+    first_functions = profiled_functions(tmp_path, first)
+    second_functions = profiled_functions(tmp_path, second)
+    assert 'first_request_work' in first_functions
+    assert 'second_request_work' not in first_functions
+    assert 'second_request_work' in second_functions
+    assert 'first_request_work' not in second_functions
+
+
+def test_async_stream_is_profiled_to_the_end_in_its_own_loop(
+    settings, tmp_path, monkeypatch
+):
+    settings.PROFILING_ENABLED = True
+    settings.PROFILE_SAMPLE_RATE = 0
+    settings.PROFILE_DIR = tmp_path
+    monkeypatch.setattr(middleware, 'is_staff', lambda request: True)
+    profiling = ProfilingMiddleware(get_streaming_response)
+
+    async def serve():
+        response = await profiling(
+            RequestFactory().get('/stream/', HTTP_X_PROFILE='1')
+        )
+        saved_early = any(tmp_path.iterdir())
+        chunks = [chunk async for chunk in response]
+        return response, saved_early, chunks
+
+    response, saved_early, chunks = asyncio.run(serve())
+
+    assert not saved_early
+    assert chunks == [b'chunk'] * 3
+    assert 'body_work' in profiled_functions(tmp_path, response)
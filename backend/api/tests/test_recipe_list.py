@@ -0,0 +1,32 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# COUNT(*), страница рецептов, ингредиенты страницы одним prefetch.
+# Автор и тег приходят JOIN, флаги пользователя — EXISTS в том же запросе.
+RECIPE_LIST_QUERIES = 3
+
+
+def list_queries(client, limit):
+    # COUNT(*) кэшируется общим ключом для любых limit; токен
+    # пользователя после очистки кэша грузится заново до замера.
+    cache.clear()
+    client.get('/api/tags/')
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(f'/api/recipes/?limit={limit}')
+    assert response.status_code == 200
+    assert len(response.json()['results']) == limit
+    return len(queries)
+
+
+@pytest.mark.parametrize('client_name', ['anonymous_client', 'user_client'])
+def test_recipe_list_query_count_does_not_grow_with_page(
+    request, client_name, make_recipe
+):
+    client = request.getfixturevalue(client_name)
+    for _ in range(25):
+        make_recipe()
+    small = list_queries(client, 2)
+    large = list_queries(client, 20)
+    assert small == large <= RECIPE_LIST_QUERIES
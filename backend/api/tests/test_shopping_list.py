@@ -0,0 +1,86 @@
+import logging
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Ingredient, ShoppingCartItem
+from api.renderers import ShoppingListRenderer
+from api.shopping_list import get_shopping_list
+
+
+def test_amounts_are_summed_in_one_query(user, make_recipe):
+    for amounts in ((100, 50), (30, 20)):
+        ShoppingCartItem.objects.create(
+            user=user, recipe=make_recipe(amounts=amounts)
+        )
+
+    with CaptureQueriesContext(connection) as queries:
+        items = list(get_shopping_list(user))
+
+    assert len(queries) == 1
+    assert items == [
+        {'name': 'мука', 'measurement_unit': 'г', 'amount': 130},
+        {'name': 'сахар', 'measurement_unit': 'г', 'amount': 70},
+    ]
+
+
+def test_same_name_with_other_unit_is_a_separate_line(
+    user, make_recipe, ingredients
+):
+    recipe = make_recipe(amounts=(100,))
+    recipe.recipe_ingredients.create(
+        ingredient=Ingredient.objects.create(
+            name='мука', measurement_unit='ст. л.'
+        ),
+        amount=2
+    )
+    ShoppingCartItem.objects.create(user=user, recipe=recipe)
+
+    assert [
+        (item['measurement_unit'], item['amount'])
+        for item in get_shopping_list(user)
+    ] == [('г', 100), ('ст. л.', 2)]
+
+
+def test_other_users_cart_is_not_counted(user, author, make_recipe):
+    ShoppingCartItem.objects.create(user=author, recipe=make_recipe())
+
+    assert list(get_shopping_list(user)) == []
+
+
+def test_download_csv(user, user_client, make_recipe):
+    for amounts in ((100, 50), (30, 20)):
+        ShoppingCartItem.objects.create(
+            user=user, recipe=make_recipe(amounts=amounts)
+        )
+
+    response = user_client.get(
+        '/api/recipes/download_shopping_cart/', {'format': 'csv'}
+    )
+
+    assert response.status_code == 200
+    lines = b''.join(response.streaming_content).decode().splitlines()
+    assert lines[1:] == ['мука,г,130', 'сахар,г,70']
+
+
+def test_time_to_first_byte_is_counted_from_request_start(
+    user, user_client, make_recipe, caplog, monkeypatch
+):
+    ShoppingCartItem.objects.create(user=user, recipe=make_recipe())
+    ticks = iter([10.0, 10.5])
+    monkeypatch.setattr('api.middleware.perf_counter', lambda: next(ticks))
+    monkeypatch.setattr('api.views.perf_counter', lambda: next(ticks))
+
+    with caplog.at_level(logging.INFO, logger='api.views'):
+        response = user_client.get(
+            '/api/recipes/download_shopping_cart/', {'format': 'txt'}
+        )
+        b''.join(response.streaming_content)
+
+    assert 'первый байт через 500.0 мс' in caplog.text
+
+
+def test_base_renderer_is_abstract():
+    with pytest.raises(TypeError):
+        ShoppingListRenderer()
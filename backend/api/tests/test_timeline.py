@@ -0,0 +1,84 @@
+from django.core.cache import cache
+
+from api import timeline
+from api.models import Subscribe, User
+from api.timeline import fan_out, get_timeline, timeline_key, version_key
+
+
+def test_new_recipe_is_pushed_to_built_timeline(
+    user, author, make_recipe, django_capture_on_commit_callbacks
+):
+    Subscribe.objects.create(user=user, subscription=author)
+    first = make_recipe()
+    assert get_timeline(user) == [first.pk]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        second = make_recipe()
+
+    assert cache.get(timeline_key(user.pk))['entries'][0][1] == second.pk
+    assert get_timeline(user) == [second.pk, first.pk]
+
+
+def test_concurrent_fan_out_does_not_lose_recipes(
+    user, author, make_recipe, monkeypatch
+):
+    Subscribe.objects.create(user=user, subscription=author)
+    get_timeline(user)
+    first, second = make_recipe(), make_recipe()
+    # Второй воркер прочитал ленту до того, как первый дописал в неё рецепт.
+    stale = cache.get_many([timeline_key(user.pk), version_key(user.pk)])
+    fan_out(first)
+    monkeypatch.setattr(
+        timeline.cache, 'get_many', lambda keys: dict(stale)
+    )
+    fan_out(second)
+    monkeypatch.undo()
+
+    assert get_timeline(user) == [second.pk, first.pk]
+
+
+def test_subscription_rebuilds_timeline(user, author, make_recipe):
+    recipe = make_recipe()
+    assert get_timeline(user) == []
+
+    Subscribe.objects.create(user=user, subscription=author)
+
+    assert get_timeline(user) == [recipe.pk]
+
+
+def test_author_crossing_fanout_limit_resets_follower_timelines(
+    user, author, make_recipe, monkeypatch,
+    django_capture_on_commit_callbacks
+):
+    monkeypatch.setattr(timeline, 'FANOUT_FOLLOWERS_LIMIT', 1)
+    Subscribe.objects.create(user=user, subscription=author)
+    assert get_timeline(user) == []
+    reader = User.objects.create(username='reader', email='r@example.com')
+
+    Subscribe.objects.create(user=reader, subscription=author)
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe = make_recipe()
+
+    assert get_timeline(user) == [recipe.pk]
+
+
+def test_fan_out_increments_only_built_timelines(
+    user, author, make_recipe, monkeypatch
+):
+    reader = User.objects.create(username='reader', email='r@example.com')
+    Subscribe.objects.create(user=user, subscription=author)
+    Subscribe.objects.create(user=reader, subscription=author)
+    get_timeline(user)
+    recipe = make_recipe()
+    incremented = []
+    incr = timeline.cache.incr
+    monkeypatch.setattr(
+        timeline.cache, 'incr',
+        lambda key: incremented.append(key) or incr(key)
+    )
+
+    fan_out(recipe)
+
+    assert incremented == [version_key(user.pk)]
+    assert get_timeline(user) == [recipe.pk]
+    assert get_timeline(reader) == [recipe.pk]
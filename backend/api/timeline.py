@@ -0,0 +1,170 @@
+from heapq import merge
+from itertools import chain, islice
+from time import time
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from api.models import Recipe, Subscribe, User
+
+TIMELINE_SIZE = 500
+TIMELINE_TIMEOUT = 60 * 60
+# У авторов с большим числом подписчиков рецепты не раскладываются
+# по лентам при публикации, а подмешиваются при чтении.
+FANOUT_FOLLOWERS_LIMIT = 1000
+
+
+def timeline_key(user_id):
+    return f'timeline:{user_id}'
+
+
+def version_key(user_id):
+    return f'timeline:{user_id}:version'
+
+
+def get_version(user_id):
+    """Версия ленты в общем кэше; сохранённая лента действительна, только
+    пока её версия совпадает с текущей."""
+    key = version_key(user_id)
+    # Начинаем с миллисекунд, а не с нуля: после вытеснения ключа
+    # версии не повторятся и старая лента не станет снова действительной.
+    cache.add(key, int(time() * 1000), None)
+    return cache.get(key)
+
+
+def bump_version(user_id):
+    """Атомарно увеличивает версию ленты и возвращает новую."""
+    key = version_key(user_id)
+    cache.add(key, int(time() * 1000), None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Ключ вытеснен между add и incr: сохранённая лента уже
+        # недействительна.
+        return None
+
+
+def recipe_entries(recipes):
+    return [
+        (pub_date.timestamp(), recipe_id)
+        for recipe_id, pub_date in recipes.values_list('id', 'pub_date')
+    ]
+
+
+def build_timeline(user):
+    """Собирает ленту пользователя из его подписок и кладёт в кэш.
+
+    Лента — до TIMELINE_SIZE пар (время публикации, id рецепта) от новых
+    к старым плюс список авторов, чьи рецепты читаются при запросе.
+    Версия читается до запросов: если за время сборки ленту изменили,
+    сохранённая копия будет недействительной.
+    """
+    version = get_version(user.pk)
+    authors = User.objects.annotate(
+        followers_count=Count('subscriptions')
+    ).filter(subscriptions__user=user).values_list('id', 'followers_count')
+    push_authors, pull_authors = [], []
+    for author_id, followers_count in authors:
+        if followers_count > FANOUT_FOLLOWERS_LIMIT:
+            pull_authors.append(author_id)
+        else:
+            push_authors.append(author_id)
+    timeline = {
+        'entries': recipe_entries(
+            Recipe.objects.filter(author__in=push_authors)[:TIMELINE_SIZE]
+        ),
+        'pull_authors': pull_authors,
+        'version': version,
+    }
+    cache.set(timeline_key(user.pk), timeline, TIMELINE_TIMEOUT)
+    return timeline
+
+
+def get_timeline(user):
+    """id рецептов ленты от новых к старым."""
+    key, current_version = timeline_key(user.pk), version_key(user.pk)
+    found = cache.get_many([key, current_version])
+    timeline = found.get(key)
+    if timeline is None or timeline['version'] != found.get(current_version):
+        timeline = build_timeline(user)
+    entries = timeline['entries']
+    if timeline['pull_authors']:
+        pulled = recipe_entries(Recipe.objects.filter(
+            author__in=timeline['pull_authors']
+        )[:TIMELINE_SIZE])
+        entries = islice(
+            merge(entries, pulled, key=lambda entry: -entry[0]),
+            TIMELINE_SIZE
+        )
+    return [recipe_id for _, recipe_id in entries]
+
+
+def fan_out(recipe):
+    """Добавляет новый рецепт в уже собранные ленты подписчиков автора.
+
+    Каждая действительная лента получает новую версию через атомарный
+    incr и дописывается, только если между чтением и incr никто другой
+    версию не менял. Иначе записанная конкурентом копия остаётся
+    недействительной, и лента пересобирается из базы при чтении, так что
+    параллельные публикации не теряются. Остальные ленты сбрасываются
+    одним delete_many, а не incr на каждого подписчика.
+    Ленты видны всем воркерам, пока кэш общий (проверка api.E001).
+    """
+    followers = list(
+        Subscribe.objects.filter(subscription_id=recipe.author_id)
+        .values_list('user_id', flat=True)[:FANOUT_FOLLOWERS_LIMIT + 1]
+    )
+    if len(followers) > FANOUT_FOLLOWERS_LIMIT:
+        return
+    found = cache.get_many(chain.from_iterable(
+        (timeline_key(user_id), version_key(user_id))
+        for user_id in followers
+    ))
+    entry = (recipe.pub_date.timestamp(), recipe.pk)
+    timelines, stale = {}, []
+    for user_id in followers:
+        key = timeline_key(user_id)
+        timeline = found.get(key)
+        version = found.get(version_key(user_id))
+        if (
+            timeline is None
+            or version is None
+            or timeline['version'] != version
+        ):
+            stale.append(user_id)
+            continue
+        try:
+            new_version = cache.incr(version_key(user_id))
+        except ValueError:
+            # Ключ версии вытеснен: без него сохранённая лента уже
+            # недействительна.
+            continue
+        if new_version != version + 1:
+            continue
+        timelines[key] = {
+            **timeline,
+            'entries': [entry] + timeline['entries'][:TIMELINE_SIZE - 1],
+            'version': new_version,
+        }
+    invalidate_timelines(stale)
+    cache.set_many(timelines, TIMELINE_TIMEOUT)
+
+
+def invalidate_timeline(user_id):
+    bump_version(user_id)
+
+
+def invalidate_timelines(user_ids):
+    """Сбрасывает ленты одним запросом к кэшу: без ключа версии get_version
+    начнёт новую, и сохранённые ленты станут недействительными."""
+    cache.delete_many([version_key(user_id) for user_id in user_ids])
+
+
+def followers_changed(author_id, added):
+    """Сбрасывает ленты подписчиков, если автор перешёл порог
+    FANOUT_FOLLOWERS_LIMIT: в готовых лентах он записан не в том списке,
+    и его новые рецепты не попали бы ни в раскладку, ни в подмешивание."""
+    followers = Subscribe.objects.filter(subscription_id=author_id)
+    crossed = FANOUT_FOLLOWERS_LIMIT + 1 if added else FANOUT_FOLLOWERS_LIMIT
+    if followers.count() == crossed:
+        invalidate_timelines(followers.values_list('user_id', flat=True))
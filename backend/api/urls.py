@@ -1,5 +1,9 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
+
+from api import async_views, metrics
+from api.profiling import ProfileView
 from api.views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
 
 router = DefaultRouter()
@@ -13,3 +17,24 @@ urlpatterns = [
     path('auth/', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    # Под ASGI горячие GET обслуживают корутины; маршруты стоят раньше
+    # роутера, остальные методы они сами передают вьюсетам.
+    urlpatterns = [
+        path('recipes/', async_views.recipe_list),
+        path('recipes/<int:pk>/', async_views.recipe_detail),
+        path('tags/', async_views.tag_list),
+        path('tags/<int:pk>/', async_views.tag_detail),
+        path('ingredients/', async_views.ingredient_list),
+        path('ingredients/<int:pk>/', async_views.ingredient_detail),
+    ] + urlpatterns
+
+if settings.METRICS_ENABLED:
+    urlpatterns.append(path('_metrics', metrics.metrics_view))
+
+if settings.PROFILING_ENABLED:
+    urlpatterns += [
+        path('_profiles/', ProfileView.as_view()),
+        path('_profiles/<str:name>', ProfileView.as_view()),
+    ]
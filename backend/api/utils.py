@@ -0,0 +1,11 @@
+from itertools import islice
+
+
+def batches(iterable, size):
+    """Делит iterable на списки длиной не больше size, не читая его
+    целиком в память."""
+    iterator = iter(iterable)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
@@ -1,48 +1,101 @@
-import io
+import logging
+from time import perf_counter
 
 from django.db import IntegrityError
-from django.db.models import Count
-from django.http import FileResponse
+from django.db.models import Prefetch, Value, prefetch_related_objects
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet as DjoserViewSet
 from rest_framework import status
 from rest_framework.decorators import action
-from rest_framework.pagination import LimitOffsetPagination
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import (
+    AllowAny,
+    IsAuthenticated,
+    IsAuthenticatedOrReadOnly
+)
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
-from api.models import Ingredient, Recipe, Subscribe, Tag, User
+from api.cache import CachedReferenceMixin
+from api.db_routers import ReplicaReadMixin
+from api.fast_serializers import RecipeListSerializer
+from api.filters import RecipeFilterBackend
+from api.ingredient_index import ingredient_index
+from api.models import (
+    Ingredient,
+    Recipe,
+    ShoppingCartItem,
+    Subscribe,
+    Tag,
+    User
+)
+from api.pagination import PageLimitPagination, RecipePagination
+from api.renderers import SHOPPING_LIST_RENDERERS
 from api.serializers import (
     IngredientSerializer,
     RecipeSerializer,
+    SubscriptionsSerializer,
     TagSerializer,
     UserSerializer
 )
-from renderers import CSVStudentDataRenderer
+from api.shopping_list import get_shopping_list
+from api.short_links import get_short_code
+from api.timeline import get_timeline
+
+logger = logging.getLogger(__name__)
 
-RECIPES_ON_PAGE = 6
 
+def log_time_to_first_byte(request, chunks, started):
+    """Пишет в лог время от started до первого куска ответа."""
+    for number, chunk in enumerate(chunks):
+        if number == 0:
+            logger.info(
+                '%s: первый байт через %.1f мс',
+                request.path, (perf_counter() - started) * 1000
+            )
+        yield chunk
 
-class IngredientViewSet(ModelViewSet):
+
+class IngredientViewSet(
+    ReplicaReadMixin, CachedReferenceMixin, ModelViewSet
+):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
 
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, self.search)
+
+    def search(self, request):
+        # Автодополнение дёргает этот эндпоинт на каждое нажатие клавиши,
+        # поэтому отвечаем из индекса в памяти, не обращаясь к базе.
+        return Response(
+            ingredient_index.search(request.query_params.get('name', ''))
+        )
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
 
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin, ModelViewSet):
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
-    pagination_class = LimitOffsetPagination
-    paginate_by = RECIPES_ON_PAGE
+    pagination_class = RecipePagination
+    filter_backends = [RecipeFilterBackend]
+    permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get_queryset(self):
-        return super().get_queryset().annotate(
-            count=Count("name")
+        return super().get_queryset().with_related().with_user_flags(
+            self.request.user
         )
 
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return RecipeListSerializer
+        return super().get_serializer_class()
+
+    def perform_create(self, serializer):
+        serializer.save(author=self.request.user)
+
     @action(
         detail=True,
         methods=['POST'],
@@ -50,37 +103,71 @@ class RecipeViewSet(ModelViewSet):
         url_path='shopping_cart'
     )
     def get_recipe_to_shop_cart(self, request, **kwargs):
-        '''
-        if request.user.is_anonymous:
-            anonymous = get_object_or_404(User, user='anonymous')
-            cart = ShopCart.object.update_or_create(user=anonymous)
-        else:
-            cart = ShopCart.object.update_or_create(user=self.request.user)
-        '''
         recipe = get_object_or_404(Recipe, pk=self.kwargs['pk'])
-        recipe.shopping_cart = get_object_or_404(User, pk=self.request.user.pk)
-        recipe.save()
+        _, created = ShoppingCartItem.objects.get_or_create(
+            user=self.request.user,
+            recipe=recipe
+        )
+        if not created:
+            return Response(
+                {'message': 'Рецепт уже в списке покупок.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         return Response(status=status.HTTP_201_CREATED)
 
+    @action(detail=True, methods=['GET'], url_path='get-link')
+    def get_link(self, request, **kwargs):
+        recipe = get_object_or_404(Recipe, pk=self.kwargs['pk'])
+        return Response({
+            'short-link': request.build_absolute_uri(
+                f'/s/{get_short_code(recipe)}/'
+            )
+        })
+
+    @action(
+        detail=False,
+        methods=['GET'],
+        permission_classes=[IsAuthenticated],
+    )
+    def feed(self, request):
+        # Лента уже собрана в кэше: читаем срез id и догружаем только
+        # рецепты текущей страницы.
+        paginator = PageLimitPagination()
+        page = paginator.paginate_queryset(
+            get_timeline(self.request.user), request, self
+        )
+        recipes = self.get_queryset().in_bulk(page)
+        serializer = RecipeListSerializer(
+            [recipes[pk] for pk in page if pk in recipes],
+            context=self.get_serializer_context()
+        )
+        return paginator.get_paginated_response(serializer.data)
+
     @action(
         detail=False,
         methods=['GET'],
         permission_classes=[IsAuthenticated],
         url_path='download_shopping_cart',
-        renderer_classes=[CSVStudentDataRenderer]
+        renderer_classes=SHOPPING_LIST_RENDERERS
     )
     def download_shopping_cart(self, request):
-        content = []
-        queryset = self.get_queryset().filter(shopping_cart=self.request.user)
-        for recipe in queryset:
-            for ingredient in recipe.ingredients:
-                content.append(ingredient.name)
-        content_as_text = ""
-        for idx, ingredient_name in content:
-            content_as_text += f"{idx}. {ingredient_name}\n"
-        file = io.BytestIO(content_as_text.encode())
-        file.seek(0)
-        return FileResponse(file, filename="shopping_list.txt")
+        # Формат выбирается параметром ?format=txt|csv|pdf.
+        renderer = request.accepted_renderer
+        # Отсчёт от прихода запроса (RequestStartMiddleware), без него,
+        # например в бенчмарках, — от вызова вью.
+        started = getattr(request, 'started_at', None) or perf_counter()
+        items = get_shopping_list(self.request.user).iterator()
+        response = StreamingHttpResponse(
+            log_time_to_first_byte(request, renderer.stream(items), started),
+            content_type=(
+                f'{renderer.media_type}; charset={renderer.charset}'
+                if renderer.charset else renderer.media_type
+            )
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_list.{renderer.format}"'
+        )
+        return response
     '''
     def download(self, request):
         user = get_object_or_404(User, pk=self.request.user.pk)
@@ -92,22 +179,21 @@ class RecipeViewSet(ModelViewSet):
     '''
 
 
-class TagViewSet(ReadOnlyModelViewSet):
+class TagViewSet(
+    ReplicaReadMixin, CachedReferenceMixin, ReadOnlyModelViewSet
+):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
 
 
-class UserViewSet(DjoserViewSet):
+class UserViewSet(ReplicaReadMixin, DjoserViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
-    paginate_by = RECIPES_ON_PAGE
-    pagination_class = LimitOffsetPagination
+    pagination_class = PageLimitPagination
     permission_classes = [AllowAny]
 
     def get_queryset(self):
-        return super().get_queryset().annotate(
-            count=Count("email")
-        )
+        return super().get_queryset().order_by('id')
 
     def get_permissions(self):
         if self.action == "me" and self.request.method == 'GET':
@@ -121,13 +207,19 @@ class UserViewSet(DjoserViewSet):
         url_path='me/avatar'
     )
     def set_delete_avatar(self, request):
-        user = get_object_or_404(User, pk=self.request.user.pk)
+        user = self.request.user
         self.request.data['username'] = user.username
         if self.request.method == 'PUT':
-            serializer = self.serializer_class(user, data=self.request.data)
+            # С контекстом запроса ссылка на аватар будет абсолютной,
+            # как и в остальных ответах.
+            serializer = self.serializer_class(
+                user,
+                data=self.request.data,
+                context=self.get_serializer_context()
+            )
             if serializer.is_valid():
-                user.avatar = serializer.validated_data['avatar']
-                user.save()
+                # Аватар сохраняет serializer.save(): повторное сохранение
+                # того же временного файла падает, он уже перемещён.
                 serializer.save()
                 return Response({'avatar': serializer.data['avatar']})
             return Response(serializer.errors)
@@ -147,19 +239,28 @@ class UserViewSet(DjoserViewSet):
         url_path='subscriptions'
     )
     def get_list_subscription(self, request):
-        if self.request.method == 'GET':
-            user = get_object_or_404(User, pk=self.request.user.pk)
-            self.request.data['username'] = user.username
-            queryset = user.subscriptions.all()
-            self.request.data['results'] = queryset
-            serializer = self.serializer_class(user, data=self.request.data)
-            if serializer.is_valid():
-                serializer.save()
-                return Response(
-                    {'results': serializer.validated_data['is_subscribed']},
-                    status=status.HTTP_200_OK
-                )
-            return Response(serializer.errors)
+        authors = User.objects.filter(
+            subscriptions__user=self.request.user
+        ).annotate(
+            is_subscribed=Value(True)
+        ).order_by('id')
+        page = self.paginate_queryset(authors)
+        recipes = Recipe.objects.only(
+            'id', 'name', 'image', 'cooking_time', 'author_id'
+        )
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        if recipes_limit and recipes_limit.isdigit():
+            recipes = recipes[:int(recipes_limit)]
+        # Срез в Prefetch превращается в ROW_NUMBER() OVER (PARTITION BY
+        # author): первые recipes_limit рецептов всех авторов страницы
+        # приходят одним запросом.
+        prefetch_related_objects(
+            page, Prefetch('recipes', queryset=recipes, to_attr='feed_recipes')
+        )
+        serializer = SubscriptionsSerializer(
+            page, many=True, context=self.get_serializer_context()
+        )
+        return self.get_paginated_response(serializer.data)
 
     @action(
         detail=False,
@@ -168,12 +269,12 @@ class UserViewSet(DjoserViewSet):
         url_path=r'(?P<sub_id>\d+)/subscribe'
     )
     def add_delete_subscription(self, request, **kwargs):
-        user = get_object_or_404(User, pk=self.request.user.pk)
+        user = self.request.user
         self.request.data['username'] = user.username
         user_subscribe = get_object_or_404(User, pk=self.kwargs['sub_id'])
         if self.request.method == 'POST':
             try:
-                subscription = Subscribe.objects.create(
+                Subscribe.objects.create(
                     user=user,
                     subscription=user_subscribe
                 )
@@ -188,7 +289,6 @@ class UserViewSet(DjoserViewSet):
                 )
             serializer = self.serializer_class(user, data=self.request.data)
             if serializer.is_valid():
-                subscription.save()
                 serializer.save()
                 return Response(
                     {'results': serializer.validated_data['is_subscribed']},
@@ -197,8 +297,15 @@ class UserViewSet(DjoserViewSet):
             return Response(serializer.errors)
 
         if self.request.method == 'DELETE':
-            subscription = get_object_or_404(User, pk=self.kwargs['sub_id'])
-            subscription.delete()
+            deleted, _ = Subscribe.objects.filter(
+                user=user,
+                subscription=user_subscribe
+            ).delete()
+            if not deleted:
+                return Response(
+                    {'message': 'Вы не подписаны на этого пользователя.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -27,6 +27,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestStartMiddleware',
+    'api.middleware.ShortLinkMiddleware',
+    'api.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -34,6 +37,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram_backend.urls'
@@ -56,24 +60,76 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram_backend.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Профиль базы выбирается переменной DB_ENGINE: sqlite (по умолчанию,
+# для одного узла) или postgresql (production).
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('POSTGRES_DB', 'django'),
+            'HOST': os.getenv('DB_HOST', '127.0.0.1'),
+            'PORT': os.getenv('DB_PORT', 5432),
+            'USER': os.getenv('POSTGRES_USER', 'django'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'django'),
+            # Постоянные соединения вместо нового подключения на запрос.
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            # Выгрузки через .iterator() читают серверным курсором;
+            # за pgbouncer в режиме transaction курсоры нужно отключить.
+            'DISABLE_SERVER_SIDE_CURSORS': (
+                os.getenv('DB_DISABLE_SERVER_SIDE_CURSORS', 'False') == 'True'
+            ),
+        }
     }
-}
-'''
-DATABASES = {
+    DATABASE_REPLICA = {'HOST': os.getenv(
+        'DB_REPLICA_HOST', DATABASES['default']['HOST']
+    )}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                'timeout': 20,
+            },
+        }
+    }
+    DATABASE_REPLICA = {
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME'])
+    }
+
+# WAL позволяет читать SQLite параллельно с записью.
+SQLITE_WAL = os.getenv('SQLITE_WAL', 'False') == 'True'
+
+# Чтение list/retrieve из реплики. Для SQLite реплика по умолчанию — тот же
+# файл, что позволяет проверить маршрутизацию без контейнеров.
+if os.getenv('DB_READ_REPLICA', 'False') == 'True':
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        **DATABASE_REPLICA,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['api.db_routers.ReadReplicaRouter']
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': os.getenv("POSTGRES_DB", 'django'),
-        'HOST': os.getenv("DB_HOST", '127.0.0.1'),
-        'PORT': os.getenv("DB_PORT", 5435),
-        'USER': os.getenv("POSTGRES_USER", 'django'),
-        'PASSWORD': os.getenv("POSTGRES_PASSWORD", 'django'),
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
     }
 }
-'''
+# Поколения справочников, индекс ингредиентов, ленты подписок и токены
+# сверяются через этот кэш. LocMemCache виден только своему процессу:
+# при нескольких воркерах (WEB_CONCURRENCY, его же читает gunicorn) нужен
+# общий бэкенд, например Redis или Memcached, иначе проверка api.E001
+# не даст запуститься.
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 1))
+# Срок жизни готовых ответов справочников, с; смена поколения делает
+# их ненужными раньше.
+REFERENCE_CACHE_TIMEOUT = int(os.getenv('REFERENCE_CACHE_TIMEOUT', 24 * 60 * 60))
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -92,7 +148,7 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -100,6 +156,41 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Асинхронные обработчики чтения (api/async_views.py); asgi.py включает их
+# по умолчанию.
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'False') == 'True'
+
+# Куда ведёт /s/<code>: страница рецепта во фронтенде.
+SHORT_LINK_REDIRECT = os.getenv('SHORT_LINK_REDIRECT', '/recipes/{id}')
+SHORT_LINK_MAX_AGE = int(os.getenv('SHORT_LINK_MAX_AGE', 24 * 60 * 60))
+
+# Метрики запросов в формате Prometheus на /api/_metrics (api/metrics.py).
+# Воркерам gunicorn нужен общий METRICS_DIR, очищаемый при старте.
+# Без METRICS_TOKEN метрики отдаются только с METRICS_ALLOWED_IPS.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'False') == 'True'
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+METRICS_ALLOWED_IPS = os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1 ::1').split()
+
+# Профилирование запросов (api/profiling.py): сотрудник добавляет
+# X-Profile: 1 или ?profile=1; PROFILE_SAMPLE_RATE — доля всех запросов,
+# которые профилируются всегда. Файлы профилей отдаёт /api/_profiles/.
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False') == 'True'
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+PROFILE_DIR = os.getenv('PROFILE_DIR', BASE_DIR / 'profiles')
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', 200))
+
+# Как часто индекс ингредиентов (api/ingredient_index.py) сверяет поколение
+# справочника в общем кэше, с.
+INGREDIENT_INDEX_CHECK_INTERVAL = float(
+    os.getenv('INGREDIENT_INDEX_CHECK_INTERVAL', 5)
+)
+
+# Срок жизни токена в общем кэше (api/authentication.py), с; выход
+# и изменения пользователя сбрасывают запись раньше.
+TOKEN_CACHE_TIMEOUT = int(os.getenv('TOKEN_CACHE_TIMEOUT', 60))
+
 DJOSER = {
     "LOGIN_FIELD": "email",
     'HIDE_USERS': False,
@@ -128,3 +219,19 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Тело запроса с изображением в base64; совпадает с client_max_body_size
+# в nginx.
+DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024
+MAX_IMAGE_UPLOAD_SIZE = int(
+    os.getenv('MAX_IMAGE_UPLOAD_SIZE', 5 * 1024 * 1024)
+)
+IMAGE_MAX_DIMENSION = int(os.getenv('IMAGE_MAX_DIMENSION', 1920))
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))
+# Варианты изображений рецептов и аватаров: имя -> максимальный размер.
+IMAGE_RENDITIONS = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'full': (1280, 1280),
+}
+IMAGE_RENDITION_FORMAT = os.getenv('IMAGE_RENDITION_FORMAT', 'WEBP')